@@ -0,0 +1,185 @@
+"""
+p50/p99 latency of the catalog and cart reads at high concurrency, WSGI
+(sync DRF views on a thread pool) against ASGI (store.async_views).
+
+    python -m benchmarks.async_load --connections 1000 --requests 20000
+    python -m benchmarks.async_load --server asgi
+
+Each of `--connections` clients sends its next request as soon as the last
+one is answered. Requests go straight into the WSGI/ASGI application, so
+the numbers are the Django side of the stack without socket overhead. The
+WSGI side gets `--threads` workers, like a gthread server.
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import setup, percentile
+
+
+def seed():
+	from store.models import Cart, CartItem, Collection, Product
+
+	collections = Collection.objects.bulk_create([Collection(title=f"Collection {i}") for i in range(10)])
+	products = Product.objects.bulk_create([
+		Product(
+			title=f"Product {i}", slug=f"product-{i}", unit_price=1 + i % 50, inventory=100,
+			collection=collections[i % len(collections)],
+		)
+		for i in range(1000)
+	])
+	carts = Cart.objects.bulk_create([Cart() for _ in range(100)])
+	for cart in carts:
+		CartItem.objects.add_items(cart.pk, [(products[(hash(cart.pk) + n) % len(products)].pk, 1) for n in range(3)])
+
+	return [
+		*["/api/v1/store/products", "/api/v1/store/products?page=2", "/api/v1/store/collections"],
+		*[f"/api/v1/store/products/{product.pk}" for product in products[:100]],
+		*[f"/api/v1/store/carts/{cart.pk}" for cart in carts],
+	]
+
+
+def split(path):
+	path, _, query = path.partition("?")
+	return path, query
+
+
+def wsgi_request(application, path):
+	path, query = split(path)
+	environ = {
+		"REQUEST_METHOD": "GET",
+		"PATH_INFO": path,
+		"QUERY_STRING": query,
+		"SERVER_NAME": "testserver",
+		"SERVER_PORT": "80",
+		"SERVER_PROTOCOL": "HTTP/1.1",
+		"HTTP_HOST": "testserver",
+		"HTTP_ACCEPT": "application/json",
+		"wsgi.input": io.BytesIO(),
+		"wsgi.url_scheme": "http",
+		"wsgi.errors": sys.stderr,
+		"wsgi.multithread": True,
+		"wsgi.multiprocess": False,
+		"wsgi.run_once": False,
+		"wsgi.version": (1, 0),
+	}
+	status = []
+	body = application(environ, lambda code, headers: status.append(code))
+	try:
+		b"".join(body)
+	finally:
+		body.close()
+	return int(status[0].split()[0])
+
+
+async def asgi_request(application, path):
+	path, query = split(path)
+	scope = {
+		"type": "http",
+		"asgi": {"version": "3.0"},
+		"http_version": "1.1",
+		"method": "GET",
+		"scheme": "http",
+		"path": path,
+		"raw_path": path.encode(),
+		"query_string": query.encode(),
+		"root_path": "",
+		"headers": [(b"host", b"testserver"), (b"accept", b"application/json")],
+		"client": ("127.0.0.1", 0),
+		"server": ("testserver", 80),
+	}
+	status = []
+
+	async def receive():
+		return {"type": "http.request", "body": b"", "more_body": False}
+
+	async def send(message):
+		if message["type"] == "http.response.start":
+			status.append(message["status"])
+
+	await application(scope, receive, send)
+	return status[0]
+
+
+async def run_clients(request, paths, connections, requests):
+	latencies, statuses = [], {}
+	remaining = requests
+
+	async def client(rng):
+		nonlocal remaining
+		while remaining > 0:
+			remaining -= 1
+			start = time.perf_counter()
+			status = await request(rng.choice(paths))
+			latencies.append((time.perf_counter() - start) * 1000)
+			statuses[status] = statuses.get(status, 0) + 1
+
+	start = time.perf_counter()
+	await asyncio.gather(*(client(random.Random(n)) for n in range(connections)))
+	return latencies, statuses, time.perf_counter() - start
+
+
+def run(args):
+	# The URLconf picks the views at import time, so this must precede setup().
+	os.environ["STORE_ASYNC_VIEWS"] = str(args.server == "asgi")
+	setup()
+	paths = seed()
+
+	if args.server == "asgi":
+		from django.core.asgi import get_asgi_application
+
+		application = get_asgi_application()
+
+		async def request(path):
+			return await asgi_request(application, path)
+
+		main = run_clients(request, paths, args.connections, args.requests)
+		latencies, statuses, elapsed = asyncio.run(main)
+	else:
+		from django.core.wsgi import get_wsgi_application
+
+		application = get_wsgi_application()
+		pool = ThreadPoolExecutor(max_workers=args.threads)
+
+		async def request(path):
+			return await asyncio.get_running_loop().run_in_executor(pool, wsgi_request, application, path)
+
+		latencies, statuses, elapsed = asyncio.run(run_clients(request, paths, args.connections, args.requests))
+		pool.shutdown()
+
+	print(
+		f"{args.server:<6}{args.connections:>12}{len(latencies):>10}{len(latencies) / elapsed:>10.0f}"
+		f"{statistics.median(latencies):>10.1f}{percentile(latencies, 0.99):>10.1f}{max(latencies):>10.1f}"
+		f"  {statuses}"
+	)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--server", choices=["wsgi", "asgi", "both"], default="both")
+	parser.add_argument("--connections", type=int, default=1000)
+	parser.add_argument("--requests", type=int, default=20_000)
+	parser.add_argument("--threads", type=int, default=32)
+	args = parser.parse_args()
+
+	if args.server != "both":
+		return run(args)
+
+	print(f"{'server':<6}{'connections':>12}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+	for server in ("wsgi", "asgi"):
+		# One process per server: each needs its own URLconf and database.
+		command = [sys.executable, "-m", "benchmarks.async_load", "--server", server]
+		command += ["--connections", str(args.connections), "--requests", str(args.requests)]
+		command += ["--threads", str(args.threads)]
+		subprocess.run(command, check=True)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,77 @@
+"""
+Authenticated request throughput on the store API, per authentication mode.
+
+    python -m benchmarks.auth --requests 2000
+
+`session` and `jwt` load the user row on every request, `stateless` builds
+the user from the token claims and only re-verifies tokens it has not seen.
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup
+
+
+PATHS = ["/api/v1/store/products/{product}", "/api/v1/store/orders"]
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--requests", type=int, default=2000)
+	args = parser.parse_args()
+
+	setup()
+
+	from django.db import connection
+	from rest_framework.authentication import SessionAuthentication
+	from rest_framework.test import APIClient
+	from rest_framework_simplejwt.authentication import JWTAuthentication
+
+	from core.models import User
+	from store import views
+	from store.authentication import StatelessJWTAuthentication
+	from store.models import Collection, Product
+
+	collection = Collection.objects.create(title="Bench")
+	product = Product.objects.create(title="Bench", slug="bench", unit_price=10, inventory=10, collection=collection)
+	User.objects.create_user(username="bench", email="bench@example.com", password="bench-password")
+
+	login = APIClient().post("/jwt-auth/jwt/create", {"username": "bench", "password": "bench-password"}, format="json")
+	access = login.json()["access"]
+
+	session_client = APIClient()
+	session_client.login(username="bench", password="bench-password")
+	jwt_client = APIClient()
+	jwt_client.credentials(HTTP_AUTHORIZATION=f"JWT {access}")
+
+	modes = [
+		("session", SessionAuthentication, session_client),
+		("jwt", JWTAuthentication, jwt_client),
+		("stateless", StatelessJWTAuthentication, jwt_client),
+	]
+	store_views = [views.StoreProductDetail, views.CustomerOrders]
+
+	print(f"{'mode':<11}{'path':<32}{'req/s':>10}{'queries':>9}")
+	for mode, authentication, client in modes:
+		for view in store_views:
+			view.authentication_classes = [authentication]
+
+		for template in PATHS:
+			path = template.format(product=product.id)
+			assert client.get(path).status_code == 200, (mode, path)
+
+			# The test client resets connection.queries per request, so count by hand.
+			queries = []
+			with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+				client.get(path)
+
+			start = time.perf_counter()
+			for _ in range(args.requests):
+				client.get(path)
+			elapsed = time.perf_counter() - start
+
+			print(f"{mode:<11}{template:<32}{args.requests / elapsed:>10.0f}{len(queries):>9}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,68 @@
+"""
+Checkout throughput with many buyers racing for the same hot product.
+
+    python -m benchmarks.checkout --buyers 200 --workers 16 --inventory 150
+
+Every buyer creates a cart, adds the hot product and places an order over
+the API. Orders beyond the inventory must be refused, never oversold.
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import setup
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--buyers", type=int, default=200)
+	parser.add_argument("--workers", type=int, default=16)
+	parser.add_argument("--inventory", type=int, default=150)
+	args = parser.parse_args()
+
+	setup()
+
+	from django.db import connection
+	from rest_framework.test import APIClient
+
+	from core.models import User
+	from store.models import Collection, Product, OrderItem
+
+	collection = Collection.objects.create(title="Hot")
+	product = Product.objects.create(
+		title="Hot product", slug="hot-product", unit_price=10, inventory=args.inventory, collection=collection
+	)
+	users = [
+		User.objects.create_user(username=f"buyer{i}", email=f"buyer{i}@example.com")
+		for i in range(args.buyers)
+	]
+
+	def buy(user):
+		client = APIClient()
+		client.force_authenticate(user)
+		try:
+			cart = client.post("/api/v1/store/carts").json()["id"]
+			client.post(f"/api/v1/store/carts/{cart}/items", {"product_id": product.id, "quantity": 1}, format="json")
+			return client.post("/api/v1/store/orders", {"cart_id": cart}, format="json").status_code
+		except Exception as exc:
+			return type(exc).__name__
+		finally:
+			connection.close()
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=args.workers) as executor:
+		statuses = Counter(executor.map(buy, users))
+	elapsed = time.perf_counter() - start
+
+	product.refresh_from_db()
+	sold = OrderItem.objects.filter(product=product).count()
+
+	print(f"buyers={args.buyers} workers={args.workers} inventory={args.inventory}")
+	print(f"elapsed={elapsed:.2f}s throughput={args.buyers / elapsed:.1f} checkouts/s")
+	print(f"outcomes={dict(statuses)}")
+	print(f"sold={sold} left={product.inventory} consistent={sold + product.inventory == args.inventory}")
+
+
+if __name__ == "__main__":
+	main()
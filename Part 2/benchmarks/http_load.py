@@ -0,0 +1,370 @@
+"""
+Throughput and latency of /api/v1/store/* over real HTTP, per endpoint,
+under WSGI and ASGI, as JSON that can be diffed across commits.
+
+    python -m benchmarks.http_load --scale 0.1 --users 32 --duration 30
+    python -m benchmarks.http_load --server asgi --output asgi.json
+
+The store is seeded once with seed_store, and every server gets its own
+copy of that database, started in a subprocess (see benchmarks.servers).
+`--users` virtual users, each on its own keep-alive connection, replay
+scripted journeys for `--duration` seconds after `--warmup`: browse the
+catalog, search, fill a cart, check out and list orders. Journeys and
+their choices come from `--seed`, so two runs send the same mix. The
+clients share the machine with the server, so compare runs from one box.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from random import Random
+
+from benchmarks.utils import setup, percentile
+
+
+PREFIX = "/api/v1/store"
+
+
+class Fixtures:
+	"""What the journeys need to know about the seeded store."""
+
+	def __init__(self, rng, customers=100):
+		from core.serializers import TokenObtainPairSerializer
+		from core.models import User
+		from store.models import Product
+		from store.pagination import DefaultPagination
+		from store.seeding import ADJECTIVES, NOUNS, Zipf
+
+		products = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+		rng.shuffle(products)
+		self.products = Zipf(rng, products, exponent=1.1)
+		self.pages = max(1, len(products) // DefaultPagination.page_size)
+		self.terms = NOUNS + [f"{adjective} {noun}" for adjective in ADJECTIVES[:5] for noun in NOUNS[:5]]
+
+		# Tokens minted here, the way /jwt-auth/jwt/create would, so logging in isn't part of the run.
+		users = User.objects.filter(customer_users__isnull=False).order_by("pk")[:customers]
+		self.tokens = [f"JWT {TokenObtainPairSerializer.get_token(user).access_token}" for user in users]
+
+
+class Recorder:
+	def __init__(self):
+		self.recording = False
+		self.latencies = defaultdict(list)
+		self.statuses = defaultdict(Counter)
+
+	def record(self, endpoint, status, latency):
+		if self.recording:
+			self.latencies[endpoint].append(latency)
+			self.statuses[endpoint][status] += 1
+
+
+class Client:
+	"""One virtual user: a keep-alive HTTP/1.1 connection timing every request."""
+
+	def __init__(self, host, port, recorder):
+		self.host = host
+		self.port = port
+		self.recorder = recorder
+		self.reader = self.writer = None
+
+	async def connect(self):
+		self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+	async def close(self):
+		if self.writer is not None:
+			self.writer.close()
+			self.reader = self.writer = None
+
+	async def request(self, method, endpoint, path, data=None, token=None):
+		"""Send a request and return (status, decoded JSON body or None). Errors count as status 0."""
+		start = time.perf_counter()
+		try:
+			status, body = await self.exchange(method, PREFIX + path, data, token)
+		except (OSError, asyncio.IncompleteReadError, ValueError):
+			await self.close()
+			status, body = 0, b""
+		self.recorder.record(endpoint, status, (time.perf_counter() - start) * 1000)
+
+		if status and body:
+			try:
+				return status, json.loads(body)
+			except ValueError:
+				pass
+		return status, None
+
+	async def exchange(self, method, path, data, token):
+		payload = b"" if data is None else json.dumps(data).encode()
+		lines = [
+			f"{method} {path} HTTP/1.1",
+			f"Host: {self.host}:{self.port}",
+			"Accept: application/json",
+			f"Content-Length: {len(payload)}",
+		]
+		if data is not None:
+			lines.append("Content-Type: application/json")
+		if token:
+			lines.append(f"Authorization: {token}")
+		message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload
+
+		# A reused connection may have been closed by the server meanwhile: retry once on a new one.
+		for attempt in range(2):
+			reused = self.writer is not None
+			if not reused:
+				await self.connect()
+			try:
+				self.writer.write(message)
+				return await self.read_response()
+			except (ConnectionError, asyncio.IncompleteReadError):
+				await self.close()
+				if not reused or attempt:
+					raise
+
+	async def read_response(self):
+		status_line = await self.reader.readline()
+		if not status_line:
+			raise ConnectionResetError("Connection closed by the server")
+		status = int(status_line.split()[1])
+
+		length, close = None, False
+		while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+			name, _, value = line.decode("latin-1").partition(":")
+			name = name.strip().lower()
+			if name == "content-length":
+				length = int(value)
+			elif name == "connection":
+				close = value.strip().lower() == "close"
+
+		if length is None:
+			body = await self.reader.read()
+			close = True
+		else:
+			body = await self.reader.readexactly(length)
+		if close:
+			await self.close()
+		return status, body
+
+
+async def browse(client, fixtures, rng):
+	await client.request("GET", "GET /products", "/products")
+	await client.request("GET", "GET /products?page", f"/products?page={rng.randint(1, fixtures.pages)}")
+	for product in fixtures.products.sample(3, rng):
+		await client.request("GET", "GET /products/{id}", f"/products/{product}")
+	await client.request("GET", "GET /collections", "/collections")
+
+
+async def search(client, fixtures, rng):
+	term = rng.choice(fixtures.terms).replace(" ", "+")
+	status, page = await client.request("GET", "GET /products?search", f"/products?search={term}")
+	if page and page.get("results"):
+		product = rng.choice(page["results"][:10])["id"]
+		await client.request("GET", "GET /products/{id}", f"/products/{product}")
+
+
+async def fill_cart(client, fixtures, rng):
+	status, cart = await client.request("POST", "POST /carts", "/carts")
+	if not cart:
+		return None
+
+	for product in set(fixtures.products.sample(rng.randint(1, 4), rng)):
+		data = {"product_id": product, "quantity": rng.randint(1, 3)}
+		await client.request("POST", "POST /carts/{id}/items", f"/carts/{cart['id']}/items", data)
+	await client.request("GET", "GET /carts/{id}", f"/carts/{cart['id']}")
+	return cart["id"]
+
+
+async def cart(client, fixtures, rng):
+	await fill_cart(client, fixtures, rng)
+
+
+async def checkout(client, fixtures, rng):
+	cart_id = await fill_cart(client, fixtures, rng)
+	if cart_id:
+		data = {"cart_id": cart_id}
+		await client.request("POST", "POST /orders", "/orders", data, token=rng.choice(fixtures.tokens))
+
+
+async def orders(client, fixtures, rng):
+	await client.request("GET", "GET /orders", "/orders", token=rng.choice(fixtures.tokens))
+
+
+# Journey -> relative weight in the mix.
+JOURNEYS = {
+	browse: 50,
+	search: 20,
+	cart: 15,
+	checkout: 10,
+	orders: 5,
+}
+
+
+async def run_load(host, port, fixtures, args):
+	recorder = Recorder()
+	journeys, weights = list(JOURNEYS), list(JOURNEYS.values())
+	deadline = time.perf_counter() + args.warmup + args.duration
+
+	async def user(number):
+		rng = Random(args.seed * 1_000_003 + number)
+		client = Client(host, port, recorder)
+		try:
+			while time.perf_counter() < deadline:
+				journey = rng.choices(journeys, weights)[0]
+				await journey(client, fixtures, rng)
+		finally:
+			await client.close()
+
+	async def measure():
+		await asyncio.sleep(args.warmup)
+		recorder.recording = True
+		start = time.perf_counter()
+		await asyncio.sleep(args.duration)
+		recorder.recording = False
+		return time.perf_counter() - start
+
+	*_, elapsed = await asyncio.gather(*(user(n) for n in range(args.users)), measure())
+	return summarize(recorder, elapsed)
+
+
+def summarize(recorder, elapsed):
+	def stats(latencies, statuses):
+		return {
+			"requests": len(latencies),
+			"rps": round(len(latencies) / elapsed, 1),
+			"p50_ms": round(percentile(latencies, 0.50), 2),
+			"p95_ms": round(percentile(latencies, 0.95), 2),
+			"p99_ms": round(percentile(latencies, 0.99), 2),
+			"max_ms": round(max(latencies), 2),
+			"statuses": {str(status): count for status, count in sorted(statuses.items())},
+		}
+
+	endpoints = {
+		endpoint: stats(latencies, recorder.statuses[endpoint])
+		for endpoint, latencies in sorted(recorder.latencies.items())
+	}
+	everything = [latency for latencies in recorder.latencies.values() for latency in latencies]
+	total = stats(everything, sum(recorder.statuses.values(), Counter())) if everything else {}
+	return {"duration_s": round(elapsed, 2), "total": total, "endpoints": endpoints}
+
+
+def free_port():
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		if process.poll() is not None:
+			raise RuntimeError(f"The server exited with {process.returncode} before listening.")
+		try:
+			with socket.create_connection(("127.0.0.1", port), timeout=1):
+				return
+		except OSError:
+			time.sleep(0.1)
+	raise RuntimeError(f"The server did not listen on port {port} within {timeout}s.")
+
+
+def remove_database(path):
+	for suffix in ("", "-wal", "-shm"):
+		if os.path.exists(path + suffix):
+			os.remove(path + suffix)
+
+
+def copy_database(source, target):
+	remove_database(target)
+	# The backup API copies a consistent snapshot, WAL included.
+	src, dst = sqlite3.connect(source), sqlite3.connect(target)
+	try:
+		src.backup(dst)
+	finally:
+		src.close()
+		dst.close()
+
+
+def server_implementation(server):
+	if server == "wsgi":
+		return "django.core.servers.basehttp"
+	if importlib.util.find_spec("uvicorn") is None:
+		return "benchmarks.servers"
+	return "uvicorn"
+
+
+def benchmark(server, database, fixtures, args):
+	copy = f"{database}.{server}"
+	copy_database(database, copy)
+	port = free_port()
+	process = subprocess.Popen(
+		[sys.executable, "-m", "benchmarks.servers", server, "--port", str(port), "--database", copy],
+	)
+	try:
+		wait_for_port(port, process)
+		result = asyncio.run(run_load("127.0.0.1", port, fixtures, args))
+	finally:
+		process.terminate()
+		process.wait()
+		remove_database(copy)
+
+	return {"server": server_implementation(server), **result}
+
+
+def git_revision():
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--server", choices=["wsgi", "asgi", "both"], default="both")
+	parser.add_argument("--scale", type=float, default=0.1, help="seed_store scale (1 is about a million rows).")
+	parser.add_argument("--users", type=int, default=32)
+	parser.add_argument("--duration", type=float, default=30)
+	parser.add_argument("--warmup", type=float, default=5)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--database", default="http_load.sqlite3")
+	parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+	args = parser.parse_args()
+
+	database = os.path.abspath(args.database)
+	setup(database)
+
+	import django
+	from django.core.management import call_command
+	from django.db import connection
+
+	call_command("seed_store", scale=args.scale, seed=args.seed, verbosity=0)
+	fixtures = Fixtures(Random(args.seed))
+	connection.close()
+
+	servers = ["wsgi", "asgi"] if args.server == "both" else [args.server]
+	report = {
+		"revision": git_revision(),
+		"python": platform.python_version(),
+		"django": django.get_version(),
+		"cpus": os.cpu_count(),
+		"options": {name: getattr(args, name) for name in ("scale", "users", "duration", "warmup", "seed")},
+		"journeys": {journey.__name__: weight for journey, weight in JOURNEYS.items()},
+		"servers": {server: benchmark(server, database, fixtures, args) for server in servers},
+	}
+
+	output = json.dumps(report, indent=2)
+	if args.output:
+		with open(args.output, "w") as file:
+			file.write(output + "\n")
+	else:
+		print(output)
+
+
+if __name__ == "__main__":
+	main()
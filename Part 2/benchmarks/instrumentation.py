@@ -0,0 +1,48 @@
+"""
+Cost of the query instrumentation middleware per sample rate.
+
+    python -m benchmarks.instrumentation --requests 2000
+
+Sends the same mix of catalog and cart reads through the WSGI application
+with STORE_QUERY_SAMPLE_RATE at 0, 1% and 100%.
+"""
+import argparse
+import time
+
+from benchmarks.async_load import seed, wsgi_request
+from benchmarks.utils import setup
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--requests", type=int, default=2000)
+	args = parser.parse_args()
+
+	setup()
+	paths = seed()
+
+	import logging
+
+	from django.conf import settings
+	from django.core.wsgi import get_wsgi_application
+
+	# Measure the recording, not a log handler.
+	logging.getLogger("store.middleware").disabled = True
+
+	print(f"{'sample rate':<14}{'req/s':>10}{'ms/req':>10}")
+	for rate in (0.0, 0.01, 1.0):
+		settings.STORE_QUERY_SAMPLE_RATE = rate
+		application = get_wsgi_application()
+		for path in paths:
+			wsgi_request(application, path)
+
+		start = time.perf_counter()
+		for n in range(args.requests):
+			wsgi_request(application, paths[n % len(paths)])
+		elapsed = time.perf_counter() - start
+
+		print(f"{rate:<14}{args.requests / elapsed:>10.1f}{elapsed / args.requests * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+	main()
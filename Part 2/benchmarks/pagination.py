@@ -0,0 +1,66 @@
+"""
+Compare offset and keyset pagination on the products list endpoint.
+
+    python -m benchmarks.pagination --pages 10000
+
+Offset pages get slower the deeper they go, keyset pages should not.
+The response cache is swapped for a dummy one, so every request paginates.
+"""
+import argparse
+
+from benchmarks.utils import setup, measure, seed_products
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--pages", type=int, default=10_000)
+	parser.add_argument("--repeat", type=int, default=10)
+	args = parser.parse_args()
+
+	setup()
+
+	from django.test import Client, override_settings
+	from rest_framework.pagination import Cursor
+
+	from store.models import Product
+	from store.pagination import DefaultPagination, KeysetPagination
+
+	page_size = DefaultPagination.page_size
+	seed_products(args.pages * page_size)
+
+	client = Client()
+	url = "/api/v1/store/products"
+
+	def keyset_url(page, ordering):
+		if page == 1:
+			return f"{url}?pagination=cursor&ordering={ordering}"
+
+		paginator = KeysetPagination()
+		paginator.ordering = (ordering,)
+		paginator.keys = paginator.get_keys()
+		paginator.base_url = f"http://testserver{url}?pagination=cursor&ordering={ordering}"
+
+		# The cursor a client would hold after walking to `page`.
+		anchor = Product.objects.order_by(*paginator.keys)[(page - 1) * page_size - 1]
+		position = paginator.get_position(anchor)
+		return paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+	print(f"{'mode':<10}{'ordering':<14}{'page':>8}{'ms':>10}")
+	with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}):
+		for ordering in ["unit_price", "-last_update"]:
+			for page in [1, args.pages]:
+				offset_url = f"{url}?page={page}&ordering={ordering}"
+				keyset = keyset_url(page, ordering)
+
+				for mode, target in [("offset", offset_url), ("keyset", keyset)]:
+					response = client.get(target)
+					assert response.status_code == 200, response.status_code
+					assert response["X-Cache"] == "MISS"
+					assert len(response.json()["results"]) == page_size
+
+					elapsed = measure(lambda: client.get(target), repeat=args.repeat)
+					print(f"{mode:<10}{ordering:<14}{page:>8}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,54 @@
+"""
+Compare the stock icontains SearchFilter with the full-text ProductSearchFilter.
+
+    python -m benchmarks.search --products 1000000
+
+Each query fetches the first page of results plus the total count, the
+same work StoreProductsList does for ?search=.
+"""
+import argparse
+
+from benchmarks.utils import setup, measure, seed_products
+
+
+QUERIES = ["coffee", "green tea", "olive oil garlic", "cheese 4242"]
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--products", type=int, default=1_000_000)
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args()
+
+	setup()
+
+	from rest_framework.filters import SearchFilter
+	from rest_framework.request import Request
+	from rest_framework.test import APIRequestFactory
+
+	from store.filters import ProductSearchFilter
+	from store.models import Product
+	from store.pagination import DefaultPagination
+	from store.views import StoreProductsList
+
+	seed_products(args.products)
+
+	factory = APIRequestFactory()
+	view = StoreProductsList()
+	page_size = DefaultPagination.page_size
+
+	def run(backend, query):
+		request = Request(factory.get("/", {"search": query}))
+		queryset = backend().filter_queryset(request, Product.objects.filter(), view)
+		return queryset.count(), list(queryset[:page_size])
+
+	print(f"{'query':<20}{'matches':>10}{'icontains ms':>15}{'fulltext ms':>15}")
+	for query in QUERIES:
+		count, _ = run(ProductSearchFilter, query)
+		icontains = measure(lambda: run(SearchFilter, query), repeat=args.repeat)
+		fulltext = measure(lambda: run(ProductSearchFilter, query), repeat=args.repeat)
+		print(f"{query:<20}{count:>10}{icontains:>15.2f}{fulltext:>15.2f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,276 @@
+"""
+CPU and memory per object of the store serializers, against a fast path
+that builds the same dicts from values() rows.
+
+    python -m benchmarks.serializers --sizes 1000 10000 100000
+    python -m benchmarks.serializers --only ProductSerializer --repeat 10
+
+Instances and rows are loaded before anything is timed, and the timed
+code runs with database access blocked, so the numbers are serialization
+alone. The seeded store (seed_store at `--scale`) is cycled to reach each
+size. Past the seeded count the nested rows of carts and orders repeat,
+which the fast path builds only once, so raise --scale for exact numbers
+at the largest size. Output is checked to render the same JSON before it
+is timed.
+
+us/obj is the median of `--repeat` runs. Memory comes from tracemalloc in
+a separate run: peak B/obj is the high-water mark of everything allocated
+while serializing (garbage included), blocks/obj the allocations still
+held by the result.
+"""
+import argparse
+import itertools
+import json
+import tracemalloc
+from collections import defaultdict
+from decimal import Decimal
+
+from benchmarks.utils import setup, measure
+
+
+TAX = Decimal(1.1)
+
+
+def datetime_representation(value):
+	# What DRF's DateTimeField renders with USE_TZ and UTC.
+	value = value.isoformat()
+	if value.endswith("+00:00"):
+		value = value[:-6] + "Z"
+	return value
+
+
+def products_fast(rows):
+	return [
+		{
+			"id": row["id"],
+			"title": row["title"],
+			"price": row["unit_price"],
+			"price_with_tax": round(row["unit_price"] * TAX, 3),
+			"collection": row["collection_id"],
+			"inventory": row["inventory"],
+			"description": row["description"],
+		}
+		for row in rows
+	]
+
+
+def collections_fast(rows):
+	return [{"id": row["id"], "title": row["title"], "products_count": row["products_count"]} for row in rows]
+
+
+def carts_fast(rows):
+	carts, items = rows
+	by_cart = defaultdict(list)
+	for item in items:
+		by_cart[item["cart_id"]].append({
+			"id": item["id"],
+			"product": {
+				"id": item["product_id"],
+				"title": item["product__title"],
+				"unit_price": item["product__unit_price"],
+			},
+			"quantity": item["quantity"],
+			"total_price": item["total_price"],
+		})
+	return [
+		{
+			"id": str(cart["id"]),
+			"created_at": datetime_representation(cart["created_at"]),
+			"cart_items": by_cart[cart["id"]],
+			"total_price": cart["total_price"],
+		}
+		for cart in carts
+	]
+
+
+def orders_fast(rows):
+	orders, items = rows
+	by_order = defaultdict(list)
+	for item in items:
+		by_order[item["order_id"]].append({
+			"id": item["id"],
+			"product": {
+				"id": item["product_id"],
+				"title": item["product__title"],
+				"unit_price": item["product__unit_price"],
+			},
+			"quantity": item["quantity"],
+			"unit_price": item["unit_price"],
+		})
+	return [
+		{
+			"id": order["id"],
+			"customer": {
+				"id": order["customer_id"],
+				"user_id": order["customer__user_id"],
+				"birth_date": order["customer__birth_date"] and order["customer__birth_date"].isoformat(),
+				"membership": order["customer__membership"],
+				"phone": order["customer__phone"],
+			},
+			"payment_status": order["payment_status"],
+			"total_amount": order["total_amount"],
+			"item_count": order["item_count"],
+			"order_items": by_order[order["id"]],
+		}
+		for order in orders
+	]
+
+
+def cycle(objects, size):
+	return list(itertools.islice(itertools.cycle(objects), size))
+
+
+def load_cases():
+	"""(serializer, instances, fast path, values() rows) per serializer, from the database."""
+	from django.db.models import Prefetch
+
+	from store.models import Cart, CartItem, Collection, Order, OrderItem, Product
+	from store.serializers import CartSerializer, CollectionSerializer, CustomerOrderSerializer, ProductSerializer
+
+	products = Product.objects.order_by("pk")
+	collections = Collection.objects.order_by("pk")
+	carts = Cart.objects.with_items().order_by("pk")
+	# The queryset CustomerOrders serializes.
+	order_items = OrderItem.objects.select_related("product").only(
+		"id", "order_id", "quantity", "unit_price", "product__id", "product__title", "product__unit_price"
+	)
+	orders = Order.objects.select_related("customer").prefetch_related(
+		Prefetch("order_items", queryset=order_items)
+	).order_by("pk")
+
+	return {
+		"ProductSerializer": (
+			ProductSerializer, list(products), products_fast,
+			list(products.values("id", "title", "unit_price", "collection_id", "inventory", "description")),
+		),
+		"CollectionSerializer": (
+			CollectionSerializer, list(collections), collections_fast,
+			list(collections.values("id", "title", "products_count")),
+		),
+		"CartSerializer": (
+			CartSerializer, list(carts), carts_fast,
+			(
+				list(carts.values("id", "created_at", "total_price")),
+				list(CartItem.objects.with_total_price().order_by("pk").values(
+					"id", "cart_id", "product_id", "product__title", "product__unit_price", "quantity", "total_price",
+				)),
+				"cart_id",
+			),
+		),
+		"CustomerOrderSerializer": (
+			CustomerOrderSerializer, list(orders), orders_fast,
+			(
+				list(orders.values(
+					"id", "payment_status", "total_amount", "item_count", "customer_id",
+					"customer__user_id", "customer__birth_date", "customer__membership", "customer__phone",
+				)),
+				list(order_items.order_by("pk").values(
+					"id", "order_id", "product_id", "product__title", "product__unit_price", "quantity", "unit_price",
+				)),
+				"order_id",
+			),
+		),
+	}
+
+
+def sized_rows(rows, size):
+	"""`size` top-level rows, with the nested rows of those parents (a prefetch's worth)."""
+	if not isinstance(rows, tuple):
+		return cycle(rows, size)
+
+	parents, children, parent_key = rows
+	parents = cycle(parents, size)
+	ids = {parent["id"] for parent in parents}
+	return parents, [child for child in children if child[parent_key] in ids]
+
+
+def normalize(rendered):
+	"""Parsed JSON with nested lists sorted by id: a prefetch has no defined order."""
+	def sort(value):
+		if isinstance(value, dict):
+			return {key: sort(item) for key, item in value.items()}
+		if isinstance(value, list):
+			items = [sort(item) for item in value]
+			if all(isinstance(item, dict) and "id" in item for item in items):
+				items.sort(key=lambda item: str(item["id"]))
+			return items
+		return value
+
+	return sort(json.loads(rendered))
+
+
+def no_queries(execute, sql, params, many, context):
+	raise AssertionError(f"Serialization queried the database: {sql}")
+
+
+def allocations(func, size):
+	tracemalloc.start()
+	try:
+		before = tracemalloc.take_snapshot()
+		tracemalloc.reset_peak()
+		start, _ = tracemalloc.get_traced_memory()
+		result = func()
+		_, peak = tracemalloc.get_traced_memory()
+		after = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+
+	blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+	del result
+	return (peak - start) / size, blocks / size
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--scale", type=float, default=0.25, help="seed_store scale of the data that is cycled.")
+	parser.add_argument("--only", nargs="+", help="Serializer names to run.")
+	args = parser.parse_args()
+
+	setup()
+
+	from django.core.management import call_command
+	from django.db import connection
+	from rest_framework.renderers import JSONRenderer
+
+	call_command("seed_store", scale=args.scale, verbosity=0)
+	cases = load_cases()
+	renderer = JSONRenderer()
+
+	print(
+		f"{'serializer':<25}{'objects':>9}{'us/obj':>10}{'values us/obj':>15}{'speedup':>9}"
+		f"{'peak B/obj':>12}{'values B/obj':>14}{'blocks/obj':>12}{'values blocks/obj':>19}"
+	)
+	for name, (serializer_class, instances, fast_path, rows) in cases.items():
+		if args.only and name not in args.only:
+			continue
+
+		check = min(1_000, len(instances))
+		expected = normalize(renderer.render(serializer_class(instances[:check], many=True).data))
+		if normalize(renderer.render(fast_path(sized_rows(rows, check)))) != expected:
+			raise SystemExit(f"The values() fast path of {name} renders different JSON.")
+
+		for size in args.sizes:
+			objects, values = cycle(instances, size), sized_rows(rows, size)
+
+			def serialize():
+				return serializer_class(objects, many=True).data
+
+			def fast():
+				return fast_path(values)
+
+			with connection.execute_wrapper(no_queries):
+				serializer_us = measure(serialize, repeat=args.repeat) * 1000 / size
+				fast_us = measure(fast, repeat=args.repeat) * 1000 / size
+				serializer_bytes, serializer_blocks = allocations(serialize, size)
+				fast_bytes, fast_blocks = allocations(fast, size)
+
+			print(
+				f"{name:<25}{size:>9}{serializer_us:>10.2f}{fast_us:>15.2f}{serializer_us / fast_us:>8.1f}x"
+				f"{serializer_bytes:>12.0f}{fast_bytes:>14.0f}{serializer_blocks:>12.1f}{fast_blocks:>19.1f}"
+			)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,167 @@
+"""
+Serve the storefront on a local port for the HTTP benchmarks, offline:
+
+    python -m benchmarks.servers wsgi --port 8001 --database http_load.sqlite3
+    python -m benchmarks.servers asgi --port 8002 --database http_load.sqlite3
+
+WSGI runs storefront.wsgi on Django's threaded HTTP/1.1 server (one thread
+per keep-alive connection). ASGI runs storefront.asgi on uvicorn when it is
+installed, otherwise on the minimal asyncio HTTP/1.1 server below, which
+buffers each response and handles nothing but what the benchmarks send.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from http import HTTPStatus
+
+
+def configure(database):
+	from django.conf import settings
+	from django.db import connections
+
+	settings.ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+	connections["default"].settings_dict["NAME"] = database
+	# The request log would cost more than some of the requests.
+	logging.getLogger("django.server").setLevel(logging.WARNING)
+
+
+def serve_wsgi(host, port, database):
+	from django.core.servers.basehttp import WSGIServer, run
+
+	from storefront.wsgi import application
+
+	configure(database)
+
+	class Server(WSGIServer):
+		# runserver's default backlog of 10 drops connections when the clients start together.
+		request_queue_size = 1024
+
+	run(host, port, application, threading=True, server_cls=Server)
+
+
+def serve_asgi(host, port, database):
+	from storefront.asgi import application
+
+	configure(database)
+
+	try:
+		import uvicorn
+	except ImportError:
+		asyncio.run(run_asgi(application, host, port))
+	else:
+		uvicorn.run(application, host=host, port=port, log_level="warning", lifespan="off")
+
+
+async def run_asgi(application, host, port):
+	server = await asyncio.start_server(
+		lambda reader, writer: handle_connection(application, (host, port), reader, writer),
+		host, port, backlog=1024,
+	)
+	async with server:
+		await server.serve_forever()
+
+
+async def handle_connection(application, server, reader, writer):
+	client = writer.get_extra_info("peername")
+	try:
+		while True:
+			request_line = await reader.readline()
+			if not request_line:
+				return
+			method, target, version = request_line.decode("latin-1").split()
+
+			headers = []
+			while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+				name, _, value = line.decode("latin-1").partition(":")
+				headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+			request_headers = dict(headers)
+			length = int(request_headers.get(b"content-length", 0))
+			body = await reader.readexactly(length) if length else b""
+
+			status, response_headers, content = await call_application(
+				application, server, client, method, target, version, headers, body
+			)
+			keep_alive = version == "HTTP/1.1" and request_headers.get(b"connection", b"").lower() != b"close"
+
+			head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+			head += [
+				f"{name.decode('latin-1')}: {value.decode('latin-1')}"
+				for name, value in response_headers
+				if name.lower() not in (b"content-length", b"connection")
+			]
+			head.append(f"Content-Length: {len(content)}")
+			head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+			writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + content)
+			await writer.drain()
+			if not keep_alive:
+				return
+	except (ConnectionError, asyncio.IncompleteReadError):
+		pass
+	finally:
+		writer.close()
+
+
+async def call_application(application, server, client, method, target, version, headers, body):
+	path, _, query = target.partition("?")
+	scope = {
+		"type": "http",
+		"asgi": {"version": "3.0"},
+		"http_version": version.split("/")[1],
+		"method": method,
+		"scheme": "http",
+		"path": path,
+		"raw_path": path.encode("latin-1"),
+		"query_string": query.encode("latin-1"),
+		"root_path": "",
+		"headers": headers,
+		"client": client,
+		"server": server,
+	}
+	response = {"status": 500, "headers": [], "body": []}
+	finished = asyncio.Event()
+	received = False
+
+	async def receive():
+		nonlocal received
+		if not received:
+			received = True
+			return {"type": "http.request", "body": body, "more_body": False}
+		# Later calls only listen for a disconnect, which comes once the response is out.
+		await finished.wait()
+		return {"type": "http.disconnect"}
+
+	async def send(message):
+		if message["type"] == "http.response.start":
+			response["status"] = message["status"]
+			response["headers"] = message.get("headers", [])
+		elif message["type"] == "http.response.body":
+			response["body"].append(message.get("body", b""))
+
+	try:
+		await application(scope, receive, send)
+	finally:
+		finished.set()
+	return response["status"], response["headers"], b"".join(response["body"])
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("server", choices=["wsgi", "asgi"])
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8000)
+	parser.add_argument("--database", required=True)
+	args = parser.parse_args()
+
+	os.environ.setdefault("DJANGO_SETTINGS_MODULE", "storefront.settings")
+	# Measure the production configuration, whatever a local .env turns on.
+	os.environ["DEBUG"] = "False"
+	os.environ["DEBUG_TOOLBAR"] = "False"
+	# ASGI is measured with the native async views, which are opt-in.
+	os.environ["STORE_ASYNC_VIEWS"] = str(args.server == "asgi")
+	serve = serve_wsgi if args.server == "wsgi" else serve_asgi
+	serve(args.host, args.port, os.path.abspath(args.database))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,105 @@
+"""
+Read and write throughput of N worker processes sharing one SQLite file.
+
+    python -m benchmarks.sqlite_load --workers 4 --seconds 10
+    python -m benchmarks.sqlite_load --workers 4 --profile default
+
+Reads fetch a cart (GET /carts/<id>), writes add a batch of items to one
+(POST /carts/<id>/items) inside an immediate transaction. `--profile default`
+runs the same load with SQLite's stock journal and sync settings.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.utils import setup
+
+
+def run_worker(worker, seconds, write_ratio, cart_ids, product_ids):
+	from django.db import connection
+	from rest_framework.test import APIClient
+
+	client = APIClient()
+	rng = random.Random(worker)
+	outcomes = Counter()
+
+	deadline = time.perf_counter() + seconds
+	while time.perf_counter() < deadline:
+		cart = rng.choice(cart_ids)
+		try:
+			if rng.random() < write_ratio:
+				operation = "write"
+				items = [{"product_id": rng.choice(product_ids), "quantity": 1} for _ in range(3)]
+				status = client.post(f"/api/v1/store/carts/{cart}/items", items, format="json").status_code
+			else:
+				operation = "read"
+				status = client.get(f"/api/v1/store/carts/{cart}").status_code
+		except Exception as exc:
+			status = type(exc).__name__
+		outcomes[operation, status] += 1
+
+	connection.close()
+	return outcomes
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--workers", type=int, default=4)
+	parser.add_argument("--seconds", type=float, default=10)
+	parser.add_argument("--write-ratio", type=float, default=0.2)
+	parser.add_argument("--carts", type=int, default=200)
+	parser.add_argument("--profile", choices=["production", "default"], default="production")
+	args = parser.parse_args()
+
+	setup()
+
+	from django.conf import settings
+	from django.db import connection
+
+	from store.models import Cart, Collection, Product
+
+	collection = Collection.objects.create(title="Load")
+	products = Product.objects.bulk_create([
+		Product(title=f"Product {i}", slug=f"product-{i}", unit_price=10, inventory=100, collection=collection)
+		for i in range(100)
+	])
+	carts = Cart.objects.bulk_create([Cart() for _ in range(args.carts)])
+	cart_ids = [str(cart.pk) for cart in carts]
+	product_ids = [product.pk for product in products]
+
+	if args.profile == "default":
+		# journal_mode is stored in the file, so it has to be switched back explicitly.
+		settings.STORE_SQLITE_PRAGMAS = {"journal_mode": "delete"}
+	connection.close()
+	connection.ensure_connection()
+	with connection.cursor() as cursor:
+		cursor.execute("PRAGMA journal_mode")
+		journal_mode = cursor.fetchone()[0]
+	# Forked workers must not share the parent's sqlite handle.
+	connection.close()
+
+	context = multiprocessing.get_context("fork")
+	with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+		futures = [
+			pool.submit(run_worker, worker, args.seconds, args.write_ratio, cart_ids, product_ids)
+			for worker in range(args.workers)
+		]
+		outcomes = sum((future.result() for future in futures), Counter())
+
+	ok, failed = Counter(), Counter()
+	for (operation, status), count in outcomes.items():
+		if status in (200, 201):
+			ok[operation] += count
+		else:
+			failed[f"{operation}:{status}"] += count
+
+	print(f"profile={args.profile} journal_mode={journal_mode} workers={args.workers} seconds={args.seconds}")
+	print(f"reads/s={ok['read'] / args.seconds:.1f} writes/s={ok['write'] / args.seconds:.1f}")
+	print(f"failed={dict(failed)}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+"""
+Compare creating users one by one (post_save creates the Customer) with the
+bulk importer (process-pool hashing + bulk_create).
+
+    python -m benchmarks.user_import --users 200
+    python -m benchmarks.user_import --users 20000 --fast-hasher
+
+Hashing dominates with the default PBKDF2 hasher, so the bulk path only
+wins there in proportion to the CPUs available to the pool.
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--users", type=int, default=200)
+	parser.add_argument("--batch-size", type=int, default=1000)
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument(
+		"--fast-hasher", action="store_true", help="Use MD5 to measure the database side without hashing cost."
+	)
+	args = parser.parse_args()
+
+	setup()
+
+	if args.fast_hasher:
+		from django.conf import settings
+		settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+	from core.models import User
+	from store.models import Customer
+	from store.user_import import import_users
+
+	def rows(prefix):
+		for i in range(args.users):
+			yield {
+				"username": f"{prefix}{i}",
+				"email": f"{prefix}{i}@example.com",
+				"first_name": "Test",
+				"last_name": f"User {i}",
+				"password": f"secret-{i}",
+			}
+
+	start = time.perf_counter()
+	for row in rows("signal"):
+		User.objects.create_user(**row)
+	signal_elapsed = time.perf_counter() - start
+
+	bulk, bulk_elapsed = import_users(rows("bulk"), batch_size=args.batch_size, workers=args.workers)
+
+	assert Customer.objects.count() == User.objects.count() == 2 * args.users
+
+	print(f"{'path':<10}{'users':>8}{'seconds':>10}{'users/s':>10}")
+	print(f"{'signal':<10}{args.users:>8}{signal_elapsed:>10.2f}{args.users / signal_elapsed:>10.1f}")
+	print(f"{'bulk':<10}{bulk:>8}{bulk_elapsed:>10.2f}{bulk / bulk_elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,78 @@
+import atexit
+import os
+import statistics
+import time
+
+import django
+
+
+def setup(database=None):
+	"""Configure Django and migrate a throwaway database for a benchmark run."""
+	os.environ.setdefault("DJANGO_SETTINGS_MODULE", "storefront.settings")
+	django.setup()
+
+	from django.conf import settings
+	from django.db import connection
+	from django.test.utils import setup_test_environment
+
+	settings.DEBUG = False
+	settings.STORE_SQLITE_WAL = True
+	if database:
+		connection.settings_dict["TEST"]["NAME"] = database
+
+	setup_test_environment()
+	old_name = connection.settings_dict["NAME"]
+	connection.creation.create_test_db(verbosity=0, autoclobber=True)
+	atexit.register(connection.creation.destroy_test_db, old_name, verbosity=0)
+
+
+def measure(func, repeat=20):
+	"""Run `func` `repeat` times and return the median wall time in milliseconds."""
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		timings.append((time.perf_counter() - start) * 1000)
+	return statistics.median(timings)
+
+
+def percentile(values, fraction):
+	values = sorted(values)
+	return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+WORDS = (
+	"organic coffee bean roast blend tea green black herbal mug cup glass steel "
+	"bottle water juice apple orange lemon lime mango berry cherry grape melon "
+	"bread flour rice pasta sauce tomato cheese butter milk cream yogurt honey "
+	"sugar salt pepper spice garlic onion ginger olive oil vinegar soap shampoo "
+	"towel napkin plate bowl knife fork spoon pan pot lid oven grill tray box"
+).split()
+
+
+def words(seed, count):
+	return " ".join(WORDS[(seed * 31 + n * 17 + n * n) % len(WORDS)] for n in range(count))
+
+
+def seed_products(count, collections=100, batch_size=10_000):
+	from decimal import Decimal
+
+	from store.models import Collection, Product
+
+	Collection.objects.bulk_create(
+		[Collection(title=f"Collection {i}") for i in range(collections)]
+	)
+	collection_ids = list(Collection.objects.values_list("id", flat=True))
+
+	for start in range(0, count, batch_size):
+		Product.objects.bulk_create([
+			Product(
+				title=f"{words(i, 3)} {i}",
+				slug=f"product-{i}",
+				description=words(i * 7 + 3, 30),
+				unit_price=Decimal(1 + (i * 7919) % 99_900) / 100,
+				inventory=1 + i % 100,
+				collection_id=collection_ids[i % collections],
+			)
+			for i in range(start, min(start + batch_size, count))
+		])
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
+
 from djoser.serializers import (
 	UserCreateSerializer as BaseUserCreateSerializer,
 	UserSerializer as BaseUserSerializer
@@ -15,4 +17,14 @@ class UserCreateSerializer(BaseUserCreateSerializer):
 class UserSerializer(BaseUserSerializer):
 	class Meta(BaseUserSerializer.Meta):
 		fields = ["id", "username", "first_name", "last_name", "email"]
-		read_only_fields = fields
\ No newline at end of file
+		read_only_fields = fields
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+	@classmethod
+	def get_token(cls, user):
+		# Claims read by stateless (TokenUser) authentication instead of a user lookup.
+		token = super().get_token(user)
+		token["is_staff"] = user.is_staff
+		token["first_name"] = user.first_name
+		return token
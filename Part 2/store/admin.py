@@ -1,11 +1,12 @@
 from django.contrib import admin
 from django.db.models import Count
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 
 from urllib.parse import urlencode
 
-from store.models import (Product, Collection, Order, OrderItem, Cart, CartItem, Customer, OrderItem)
+from store.models import (Product, Collection, Order, OrderItem, Cart, CartItem, Customer, OrderItem, OutboxEvent)
 
 admin.site.register(OrderItem)
 
@@ -46,9 +47,6 @@ class CollectionAdmin(admin.ModelAdmin):
 
 		return format_html("<a href='{}'>{}</a>", url_with_query_parameters, collection.products_count)
 
-	def get_queryset(self, request):
-		return super().get_queryset(request).annotate(products_count=Count("products"))
-
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -111,11 +109,27 @@ class OrderItemAdmin(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ["id", "placed_at", "customer"]
-    list_select_related = ["customer"]
+    list_display = ["id", "placed_at", "customer", "item_count", "total_amount"]
+    list_select_related = ["customer__user"]
     autocomplete_fields = ["customer"]
     inlines = [OrderItemAdmin]
 
 
 admin.site.register(Cart)
-admin.site.register(CartItem)
\ No newline at end of file
+admin.site.register(CartItem)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ["id", "topic", "status", "attempts", "created_at", "available_at"]
+    list_filter = ["status", "topic"]
+    list_per_page = 50
+    readonly_fields = ["topic", "payload", "attempts", "last_error", "created_at", "processed_at", "claimed_by", "claimed_until"]
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected events")
+    def requeue(self, request, queryset):
+        updated_count = queryset.update(
+            status=OutboxEvent.STATUS_PENDING, attempts=0, available_at=timezone.now(), claimed_by="", claimed_until=None
+        )
+        self.message_user(request, message=f"{updated_count} events were requeued.")
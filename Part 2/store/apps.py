@@ -1,4 +1,13 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    # SQLite drops the index triggers whenever a migration remakes store_product.
+    from store import search
+
+    search.ensure_installed(connections[using])
 
 
 class StoreConfig(AppConfig):
@@ -7,3 +16,6 @@ class StoreConfig(AppConfig):
 
     def ready(self):
         import store.signals
+        import store.handlers
+
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,211 @@
+import math
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from store import views
+from store.cache import get_conditional, get_etag, get_response_cache_key, set_validators
+from store.filters import ProductFilter
+from store.models import Product, Collection, Promotion, Cart
+from store.serializers import ProductSerializer, CollectionSerializer, CartSerializer
+
+
+JSON_ACCEPT = {"", "*/*", "application/json"}
+
+
+class AsyncReadView(View):
+	"""
+	Serve the common JSON GET of a store endpoint natively async, and hand
+	every other request (writes, the browsable API, credentials, parameters
+	the fast path doesn't implement) to `sync_view`, the DRF view owning the
+	URL, so the URL contract and response bodies are unchanged.
+
+	The 4.2 async ORM still runs queries on Django's sync thread, but cache
+	hits, conditional responses and rendering never leave the event loop.
+	"""
+	sync_view = None
+	sync_handler = None
+	allow = None
+	fast_params = set()
+	cache_models = []
+	cache_timeout = getattr(settings, "STORE_CACHE_TIMEOUT", 60 * 15)
+
+	@classonlymethod
+	def as_view(cls, **initkwargs):
+		sync_view = cls.sync_view()
+		# setup() adds HEAD the way a dispatched view has it, for the Allow header.
+		sync_view.setup(None)
+		view = super().as_view(
+			sync_handler=cls.sync_view.as_view(),
+			allow=", ".join(sync_view.allowed_methods),
+			**initkwargs,
+		)
+		# DRF enforces CSRF itself for session authenticated writes.
+		view.csrf_exempt = True
+		return view
+
+	async def dispatch(self, request, *args, **kwargs):
+		if request.method == "GET" and self.is_fast(request):
+			response = await self.get(request, *args, **kwargs)
+			if response is not None:
+				response["Allow"] = self.allow
+				response["Vary"] = "Accept"
+				return response
+		return await self.fallback(request, *args, **kwargs)
+
+	def is_fast(self, request):
+		return (
+			"Authorization" not in request.headers
+			and request.headers.get("Accept", "") in JSON_ACCEPT
+			and set(request.GET) <= self.fast_params
+		)
+
+	@sync_to_async
+	def fallback(self, request, *args, **kwargs):
+		response = self.sync_handler(request, *args, **kwargs)
+		# The browsable API may query while rendering, so render on this thread.
+		if hasattr(response, "render"):
+			response.render()
+		return response
+
+	def render(self, data):
+		return HttpResponse(JSONRenderer().render(data), content_type="application/json")
+
+	async def get_cached(self, request, build):
+		"""
+		(response, last modified) from the cache entry the sync view shares, or
+		from `build()`, which returns (data, last modified) or None to fall back.
+		"""
+		key = get_response_cache_key(request, self.cache_models)
+		cached = cache.get(key)
+		if cached is not None:
+			data, modified = cached
+			response = self.render(data)
+			response["X-Cache"] = "HIT"
+			return response, modified
+
+		built = await build()
+		if built is None:
+			return None, None
+		data, modified = built
+		cache.set(key, (data, modified), timeout=self.cache_timeout)
+		response = self.render(data)
+		response["X-Cache"] = "MISS"
+		return response, modified
+
+	async def get_conditional(self, request, build):
+		# Same validators as ConditionalGetMixin, so either path answers the other's ETags.
+		etag = get_etag(request, "json", self.cache_models)
+		if "If-None-Match" in request.headers:
+			response = get_conditional(request, etag)
+			if response is not None:
+				return response
+
+		response, modified = await self.get_cached(request, build)
+		if response is None:
+			return None
+		response = get_conditional(request, etag, modified) or response
+		set_validators(response, etag, modified)
+		return response
+
+
+class ProductsList(AsyncReadView):
+	sync_view = views.StoreProductsList
+	fast_params = {"page", "collection_id", "unit_price__gt", "unit_price__lt"}
+	cache_models = [Product, Promotion]
+
+	async def get(self, request):
+		filterset = ProductFilter(request.GET, queryset=Product.objects.filter(), request=request)
+		if "collection_id" in request.GET:
+			# Validating collection_id looks the collection up.
+			is_valid = await sync_to_async(filterset.is_valid)()
+		else:
+			is_valid = filterset.is_valid()
+		if not is_valid:
+			return None
+		queryset = filterset.qs
+
+		async def build():
+			count = await queryset.acount()
+			page_size = self.sync_view.pagination_class.page_size
+			num_pages = max(1, math.ceil(count / page_size))
+			page = request.GET.get("page", "1")
+			if not page.isdigit() or not 1 <= int(page) <= num_pages:
+				return None
+			page = int(page)
+
+			offset = (page - 1) * page_size
+			products = [product async for product in queryset[offset:offset + page_size]]
+
+			url = request.build_absolute_uri()
+			next_link = replace_query_param(url, "page", page + 1) if page < num_pages else None
+			previous_link = None
+			if page == 2:
+				previous_link = remove_query_param(url, "page")
+			elif page > 2:
+				previous_link = replace_query_param(url, "page", page - 1)
+
+			data = OrderedDict([
+				("count", count),
+				("next", next_link),
+				("previous", previous_link),
+				("results", ProductSerializer(products, many=True).data),
+			])
+			return data, max((product.last_update for product in products), default=None)
+
+		return await self.get_conditional(request, build)
+
+
+class ProductDetail(AsyncReadView):
+	sync_view = views.StoreProductDetail
+	cache_models = [Product, Promotion]
+
+	async def get(self, request, id):
+		async def build():
+			product = await Product.objects.filter(pk=id).afirst()
+			if product is None:
+				return None
+			return ProductSerializer(product).data, product.last_update
+
+		return await self.get_conditional(request, build)
+
+
+class CollectionsList(AsyncReadView):
+	sync_view = views.StoreCollectionList
+	cache_models = [Collection]
+
+	async def get(self, request):
+		async def build():
+			collections = [collection async for collection in Collection.objects.filter()]
+			return CollectionSerializer(collections, many=True).data, None
+
+		response, _ = await self.get_cached(request, build)
+		return response
+
+
+class CartDetail(AsyncReadView):
+	sync_view = views.CartDetail
+
+	async def get(self, request, uid):
+		try:
+			# aget() runs the prefetch on the ORM thread along with the query.
+			cart = await Cart.objects.with_items().aget(pk=uid)
+		except Cart.DoesNotExist:
+			return None
+		return self.render(CartSerializer(cart).data)
+
+
+def read_view(sync_view, async_view):
+	"""The view for a store URL: `async_view` when serving ASGI with STORE_ASYNC_VIEWS."""
+	if getattr(settings, "STORE_ASYNC_VIEWS", False):
+		return async_view.as_view()
+	return sync_view.as_view()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+DENYLIST_KEY = "store:jwt:denied:{}"
+USER_DENYLIST_KEY = "store:jwt:denied-user:{}"
+
+
+class ValidatedTokenCache:
+	"""A small thread-safe LRU of raw token -> validated token, honouring exp."""
+
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.tokens = OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, raw_token):
+		with self.lock:
+			token = self.tokens.get(raw_token)
+			if token is None:
+				return None
+			if token["exp"] <= time.time():
+				del self.tokens[raw_token]
+				return None
+			self.tokens.move_to_end(raw_token)
+			return token
+
+	def set(self, raw_token, token):
+		with self.lock:
+			self.tokens[raw_token] = token
+			self.tokens.move_to_end(raw_token)
+			while len(self.tokens) > self.maxsize:
+				self.tokens.popitem(last=False)
+
+	def clear(self):
+		with self.lock:
+			self.tokens.clear()
+
+
+validated_tokens = ValidatedTokenCache(getattr(settings, "STORE_JWT_CACHE_SIZE", 10_000))
+
+
+def revoke_token(token):
+	"""Deny `token` (a validated token) until it would have expired anyway."""
+	timeout = max(1, int(token["exp"] - time.time()))
+	cache.set(DENYLIST_KEY.format(token[api_settings.JTI_CLAIM]), True, timeout=timeout)
+
+
+def revoke_user_tokens(user_id):
+	"""
+	Deny every access token issued to `user_id` before now. Tokens issued
+	within the current second stay valid, so logging in again right away works.
+	"""
+	timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+	cache.set(USER_DENYLIST_KEY.format(user_id), int(time.time()), timeout=timeout)
+
+
+def is_revoked(token):
+	token_key = DENYLIST_KEY.format(token[api_settings.JTI_CLAIM])
+	user_key = USER_DENYLIST_KEY.format(token.get(api_settings.USER_ID_CLAIM))
+	denied = cache.get_many([token_key, user_key])
+
+	if token_key in denied:
+		return True
+	return user_key in denied and token.get("iat", 0) < denied[user_key]
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+	"""
+	JWT authentication without a database hit: the user is a TokenUser built
+	from the claims, and signatures already checked by this process are
+	remembered in an LRU. Only the denylists (per token and per user) are
+	consulted on every request.
+	"""
+
+	def get_validated_token(self, raw_token):
+		token = validated_tokens.get(raw_token)
+		if token is None:
+			token = super().get_validated_token(raw_token)
+			validated_tokens.set(raw_token, token)
+
+		if is_revoked(token):
+			raise InvalidToken("Token has been revoked")
+		return token
+
+
+STORE_AUTHENTICATION_CLASSES = [StatelessJWTAuthentication, SessionAuthentication]
@@ -0,0 +1,163 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.response import Response
+
+
+GENERATION_KEY = "store:generation:{}"
+RESPONSE_KEY = "store:response:{}"
+
+
+def get_generation(model):
+	key = GENERATION_KEY.format(model._meta.label_lower)
+	generation = cache.get(key)
+	if generation is None:
+		# Start from the clock so an evicted counter never reuses an old value.
+		cache.add(key, time.time_ns(), timeout=None)
+		generation = cache.get(key)
+	return generation
+
+
+def bump_generation(model):
+	"""Invalidate every cached response that depends on `model`, in O(1)."""
+	key = GENERATION_KEY.format(model._meta.label_lower)
+
+	def bump():
+		try:
+			cache.incr(key)
+		except ValueError:
+			cache.add(key, time.time_ns(), timeout=None)
+
+	# Bumping before commit would let a concurrent read cache the old rows
+	# under the new generation.
+	transaction.on_commit(bump)
+
+
+def normalize_query_params(query_params):
+	return urlencode(
+		sorted((key, value) for key, values in query_params.lists() for value in values if value != "")
+	)
+
+
+def get_generations(models):
+	return ",".join(str(get_generation(model)) for model in models)
+
+
+def get_response_cache_key(request, models):
+	"""
+	Key for `request`'s response at the current generation of `models`. The
+	cached value is (response data, newest validator value in it or None).
+	"""
+	raw = "|".join([
+		request.build_absolute_uri(request.path),
+		normalize_query_params(request.GET),
+		get_generations(models),
+	])
+	return RESPONSE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_etag(request, format, models):
+	"""
+	ETag of `request`'s response: every write to `models` bumps a generation,
+	so it is known without touching the database.
+	"""
+	raw = "|".join([
+		request.path,
+		normalize_query_params(request.GET),
+		format,
+		get_generations(models),
+	])
+	return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def get_conditional(request, etag, modified=None):
+	"""The 304 for `request` given the response's validators, or None."""
+	last_modified = int(modified.timestamp()) if modified is not None else None
+	response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+	if response is not None:
+		set_validators(response, etag, modified)
+	return response
+
+
+def set_validators(response, etag, modified=None):
+	response["ETag"] = etag
+	if modified is not None:
+		response["Last-Modified"] = http_date(int(modified.timestamp()))
+
+
+class CachedResponseMixin:
+	"""
+	Cache list/retrieve response data keyed on the URL, the normalized query
+	params and the generation of every model in `cache_models`.
+	"""
+	cache_models = []
+	cache_timeout = getattr(settings, "STORE_CACHE_TIMEOUT", 60 * 15)
+	# Newest validator value of the rows in the response, if a subclass records it.
+	last_modified = None
+
+	def get_response_cache_key(self, request):
+		return get_response_cache_key(request, self.cache_models)
+
+	def get_cached_response(self, handler, request, *args, **kwargs):
+		key = self.get_response_cache_key(request)
+		cached = cache.get(key)
+		if cached is not None:
+			data, self.last_modified = cached
+			response = Response(data)
+			response["X-Cache"] = "HIT"
+			return response
+
+		response = handler(request, *args, **kwargs)
+		if response.status_code == 200:
+			cache.set(key, (response.data, self.last_modified), timeout=self.cache_timeout)
+		response["X-Cache"] = "MISS"
+		return response
+
+	def list(self, request, *args, **kwargs):
+		return self.get_cached_response(super().list, request, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+	"""
+	Answer If-None-Match / If-Modified-Since with 304. The ETag comes from the
+	generations of `cache_models`, so If-None-Match costs no query at all;
+	Last-Modified is the newest `validator_field` among the serialized rows,
+	cached with the response by CachedResponseMixin.
+	"""
+	validator_field = "last_update"
+
+	def get_serializer(self, *args, **kwargs):
+		if args and self.request.method == "GET":
+			instances = args[0] if kwargs.get("many") else [args[0]]
+			values = [getattr(instance, self.validator_field) for instance in instances]
+			self.last_modified = max(values, default=None)
+		return super().get_serializer(*args, **kwargs)
+
+	def get_conditional(self, handler, request, *args, **kwargs):
+		etag = get_etag(request, request.accepted_renderer.format, self.cache_models)
+		if "If-None-Match" in request.headers:
+			response = get_conditional(request, etag)
+			if response is not None:
+				return response
+
+		response = handler(request, *args, **kwargs)
+		if response.status_code == 200:
+			response = get_conditional(request, etag, self.last_modified) or response
+			set_validators(response, etag, self.last_modified)
+		return response
+
+	def list(self, request, *args, **kwargs):
+		return self.get_conditional(super().list, request, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		return self.get_conditional(super().retrieve, request, *args, **kwargs)
@@ -1,5 +1,10 @@
 from django_filters.rest_framework import FilterSet
 
+from django.db import connections
+
+from rest_framework.filters import SearchFilter
+
+from store import search
 from store.models import Product
 
 
@@ -9,4 +14,19 @@ class ProductFilter(FilterSet):
 		fields = {
 			"collection_id": ["exact"],
 			"unit_price": ["gt", "lt"]
-		}
\ No newline at end of file
+		}
+
+
+class ProductSearchFilter(SearchFilter):
+	"""
+	SearchFilter backed by the product full-text index (see store.search),
+	ranked by relevance. Falls back to icontains on other databases.
+	"""
+
+	def filter_queryset(self, request, queryset, view):
+		search_terms = self.get_search_terms(request)
+
+		if not search_terms or not search.is_supported(connections[queryset.db]):
+			return super().filter_queryset(request, queryset, view)
+
+		return search.search(queryset, search_terms)
@@ -0,0 +1,24 @@
+import logging
+
+from store.outbox import handler
+
+
+logger = logging.getLogger(__name__)
+
+
+# Side effects of store events (emails, webhooks, analytics, ...) belong
+# here, off the request path. They must be safe to run more than once.
+
+@handler("order.placed")
+def log_order_placed(payload):
+	logger.info("Order %s placed by customer %s", payload["order_id"], payload["customer_id"])
+
+
+@handler("inventory.reserved")
+def log_inventory_reserved(payload):
+	logger.info("Inventory reserved for order %s: %s", payload["order_id"], payload["products"])
+
+
+@handler("customer.created")
+def log_customer_created(payload):
+	logger.info("Customer %s created for user %s", payload["customer_id"], payload["user_id"])
@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+IDEMPOTENCY_KEY = "store:idempotency:{}"
+
+
+class IdempotentPostMixin:
+	"""
+	Honour an Idempotency-Key header on POST. The first response is stored in
+	the cache for `idempotency_ttl` seconds and replayed for any retry with
+	the same key, so the view's create() never runs twice. Use a cache shared
+	by all workers (file, Redis, ...) for this to hold across processes.
+	"""
+	idempotency_header = "Idempotency-Key"
+	idempotency_ttl = getattr(settings, "STORE_IDEMPOTENCY_TTL", 60 * 60 * 24)
+	# How long a key stays claimed while its first request is still running.
+	idempotency_lock_timeout = 60
+
+	def get_idempotency_cache_key(self, request, key):
+		user = request.user.pk if request.user and request.user.is_authenticated else ""
+		raw = "|".join([str(user), request.path, key])
+		return IDEMPOTENCY_KEY.format(hashlib.sha256(raw.encode()).hexdigest())
+
+	def get_request_fingerprint(self, request):
+		body = json.dumps(request.data, sort_keys=True, default=str)
+		return hashlib.sha256(body.encode()).hexdigest()
+
+	def post(self, request, *args, **kwargs):
+		key = request.headers.get(self.idempotency_header)
+		if not key:
+			return super().post(request, *args, **kwargs)
+
+		cache_key = self.get_idempotency_cache_key(request, key)
+		fingerprint = self.get_request_fingerprint(request)
+
+		claimed = cache.add(
+			cache_key, {"fingerprint": fingerprint, "in_progress": True}, timeout=self.idempotency_lock_timeout
+		)
+		if not claimed:
+			return self.replay(cache.get(cache_key), fingerprint)
+
+		try:
+			response = super().post(request, *args, **kwargs)
+		except Exception:
+			cache.delete(cache_key)
+			raise
+
+		if status.is_server_error(response.status_code):
+			cache.delete(cache_key)
+		else:
+			cache.set(
+				cache_key,
+				{"fingerprint": fingerprint, "status": response.status_code, "data": response.data},
+				timeout=self.idempotency_ttl,
+			)
+		return response
+
+	def replay(self, stored, fingerprint):
+		if stored is None or stored.get("in_progress"):
+			return Response(
+				{"detail": "A request with this Idempotency-Key is still being processed."},
+				status=status.HTTP_409_CONFLICT,
+			)
+
+		if stored["fingerprint"] != fingerprint:
+			return Response(
+				{"detail": "This Idempotency-Key was already used with a different request body."},
+				status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			)
+
+		response = Response(stored["data"], status=stored["status"])
+		response["Idempotent-Replayed"] = "true"
+		return response
@@ -0,0 +1,67 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+
+
+_recorder = ContextVar("store_query_recorder", default=None)
+
+
+class QueryRecorder:
+	"""Counts and times the queries of one request, keyed on the raw SQL."""
+	__slots__ = ("count", "duration", "statements")
+
+	def __init__(self):
+		self.count = 0
+		self.duration = 0.0
+		self.statements = Counter()
+
+	def record(self, sql, duration):
+		self.count += 1
+		self.duration += duration
+		self.statements[sql] += 1
+
+	def repeated(self, threshold):
+		"""Fingerprints of statements run more than `threshold` times, with their counts."""
+		fingerprints = Counter()
+		for sql, count in self.statements.items():
+			fingerprints[fingerprint(sql)] += count
+		return {sql: count for sql, count in fingerprints.most_common() if count > threshold}
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+	"""Normalize literals and IN lists away, so one statement with any arguments looks the same."""
+	sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+	sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+	sql = re.sub(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)", "(?)", sql)
+	return re.sub(r"\s+", " ", sql).strip()
+
+
+def record_query(execute, sql, params, many, context):
+	# Installed on every connection; costs one ContextVar lookup when not sampling.
+	recorder = _recorder.get()
+	if recorder is None:
+		return execute(sql, params, many, context)
+
+	start = time.perf_counter()
+	try:
+		return execute(sql, params, many, context)
+	finally:
+		recorder.record(sql, time.perf_counter() - start)
+
+
+def install(connection):
+	if record_query not in connection.execute_wrappers:
+		connection.execute_wrappers.append(record_query)
+
+
+def start_recording():
+	"""Record queries in this context (a request, including its sync_to_async hops) until stopped."""
+	recorder = QueryRecorder()
+	return recorder, _recorder.set(recorder)
+
+
+def stop_recording(token):
+	_recorder.reset(token)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Order
+
+
+class Command(BaseCommand):
+	help = "Write the stored summary of existing orders, in chunks."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--chunk-size", type=int, default=1000)
+		parser.add_argument("--all", action="store_true", help="Rewrite summaries that are already set too.")
+
+	def handle(self, *args, **options):
+		queryset = Order.objects.order_by("pk")
+		if not options["all"]:
+			queryset = queryset.filter(summary="")
+
+		last_pk = 0
+		updated = 0
+		while True:
+			pks = list(queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[:options["chunk_size"]])
+			if not pks:
+				break
+
+			with transaction.atomic():
+				updated += Order.objects.filter(pk__in=pks).refresh_summaries()
+
+			last_pk = pks[-1]
+			self.stdout.write(f"{updated} orders summarized...")
+
+		self.stdout.write(self.style.SUCCESS(f"{updated} order summaries written."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from store.user_import import import_users, read_users
+
+
+class Command(BaseCommand):
+	help = (
+		"Bulk import users with their customers from a CSV (header row) or NDJSON file. "
+		"Columns: username, email, first_name, last_name, password, phone, birth_date, membership."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("path")
+		parser.add_argument("--batch-size", type=int, default=1000)
+		parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPUs).")
+
+	def handle(self, *args, **options):
+		def report(imported, elapsed):
+			self.stdout.write(f"{imported} users imported, {imported / elapsed:.0f} users/s")
+
+		try:
+			imported, elapsed = import_users(
+				read_users(options["path"]),
+				batch_size=options["batch_size"],
+				workers=options["workers"],
+				report=report,
+			)
+		except IntegrityError as exc:
+			raise CommandError(f"Import stopped, the failing batch was rolled back: {exc}")
+
+		self.stdout.write(self.style.SUCCESS(
+			f"Imported {imported} users in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} users/s)."
+		))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store import search
+
+
+class Command(BaseCommand):
+	help = "Recreate and refill the product full-text search index."
+
+	def handle(self, *args, **options):
+		if not search.is_supported():
+			raise CommandError("Full-text search needs SQLite (FTS5) or PostgreSQL.")
+
+		search.rebuild()
+		self.stdout.write(self.style.SUCCESS("Product search index rebuilt."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Order
+
+
+class Command(BaseCommand):
+	help = "Find orders whose stored total_amount / item_count drifted from their items, and optionally fix them."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--fix", action="store_true", help="Rewrite the drifted totals.")
+		parser.add_argument("--chunk-size", type=int, default=10_000)
+
+	def handle(self, *args, **options):
+		chunk_size = options["chunk_size"]
+		last_pk = 0
+		drifted = 0
+
+		while True:
+			pks = list(
+				Order.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+			)
+			if not pks:
+				break
+
+			with transaction.atomic():
+				drift = list(Order.objects.filter(pk__in=pks).with_drifted_totals().values_list("pk", flat=True))
+				if drift and options["fix"]:
+					Order.objects.filter(pk__in=drift).refresh_totals()
+
+			drifted += len(drift)
+			last_pk = pks[-1]
+
+		if options["fix"]:
+			self.stdout.write(self.style.SUCCESS(f"{drifted} orders had drifted and were fixed."))
+		elif drifted:
+			self.stdout.write(self.style.WARNING(f"{drifted} orders have drifted; rerun with --fix."))
+		else:
+			self.stdout.write(self.style.SUCCESS("No drift found."))
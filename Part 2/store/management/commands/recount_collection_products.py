@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Collection
+
+
+class Command(BaseCommand):
+	help = "Recompute the stored Collection.products_count from the products table."
+
+	def handle(self, *args, **options):
+		updated = Collection.objects.recount_products()
+		self.stdout.write(self.style.SUCCESS(f"{updated} collections recounted."))
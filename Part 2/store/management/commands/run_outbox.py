@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from store import outbox
+
+
+class Command(BaseCommand):
+	help = "Claim outbox events in batches and dispatch them to their registered handlers."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--batch-size", type=int, default=100)
+		parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+		parser.add_argument("--max-attempts", type=int, default=5)
+		parser.add_argument("--backoff", type=float, default=10.0, help="Seconds before the first retry.")
+		parser.add_argument("--lease", type=float, default=300.0, help="Seconds a claimed batch stays reserved.")
+		parser.add_argument("--once", action="store_true", help="Drain what is due and exit.")
+
+	def handle(self, *args, **options):
+		lease = timedelta(seconds=options["lease"])
+		backoff = timedelta(seconds=options["backoff"])
+
+		while True:
+			events = outbox.claim_batch(options["batch_size"], lease=lease)
+
+			if events:
+				done, failed = outbox.dispatch(events, max_attempts=options["max_attempts"], backoff=backoff)
+				self.stdout.write(f"{len(done)} dispatched, {len(failed)} failed.")
+				continue
+
+			if options["once"]:
+				break
+			time.sleep(options["poll_interval"])
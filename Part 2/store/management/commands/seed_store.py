@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from store.seeding import StoreSeeder
+
+
+class Command(BaseCommand):
+	help = (
+		"Fill the store with deterministic synthetic data for load testing: Zipfian product popularity, "
+		"power-law cart and order sizes. --scale 1 is about a million rows."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--scale", type=float, default=1.0, help="Multiplies every row count.")
+		parser.add_argument("--seed", type=int, default=0, help="Same seed, same data. Usernames include it.")
+		parser.add_argument("--batch-size", type=int, default=10_000)
+		parser.add_argument("--password", default=None, help="Password of every seeded user (default: unusable).")
+
+	def handle(self, *args, **options):
+		def report(label, rows, elapsed):
+			if options["verbosity"] > 1:
+				self.stdout.write(f"{label}: {rows} rows, {elapsed:.1f}s")
+
+		seeder = StoreSeeder(
+			scale=options["scale"],
+			seed=options["seed"],
+			batch_size=options["batch_size"],
+			password=options["password"],
+			report=report,
+		)
+		try:
+			counts = seeder.run()
+		except IntegrityError as exc:
+			raise CommandError(f"Seeding stopped, the failing batch was rolled back (reusing a --seed?): {exc}")
+
+		if options["verbosity"] < 1:
+			return
+		for label, rows in counts.items():
+			self.stdout.write(f"{label:<24}{rows:>12}")
+		total = sum(counts.values())
+		elapsed = seeder.elapsed()
+		self.stdout.write(self.style.SUCCESS(f"Seeded {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)."))
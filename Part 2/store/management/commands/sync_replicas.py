@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from store.cache import bump_generation
+from store.models import Collection, Product, Promotion
+from store.routers import get_replicas
+
+
+class Command(BaseCommand):
+	help = "Copy the primary SQLite database into every read replica (local setups without streaming replication)."
+
+	def handle(self, *args, **options):
+		primary = connections[DEFAULT_DB_ALIAS]
+		if primary.vendor != "sqlite":
+			raise CommandError("Only SQLite replicas can be synced by copying; use the database's own replication.")
+
+		primary.ensure_connection()
+		for alias in get_replicas():
+			replica = connections[alias]
+			replica.ensure_connection()
+			# The online backup API copies a consistent snapshot while primary keeps serving.
+			primary.connection.backup(replica.connection)
+			self.stdout.write(self.style.SUCCESS(f"{alias} synced from {DEFAULT_DB_ALIAS}."))
+
+		# A cache miss since the last sync may have stored a replica's stale
+		# rows under the current generation; start the catalog over.
+		for model in (Product, Collection, Promotion):
+			bump_generation(model)
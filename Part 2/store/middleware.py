@@ -0,0 +1,187 @@
+import json
+import logging
+import random
+import time
+from collections import namedtuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from store.instrumentation import start_recording, stop_recording
+from store.models import Customer
+from store.routers import get_replicas, has_written, pinning
+
+
+CUSTOMER_KEY = "store:customer:{}"
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "store_pin_primary"
+
+CustomerRef = namedtuple("CustomerRef", ["id", "membership"])
+
+
+def get_customer_cache_key(user_id):
+	return CUSTOMER_KEY.format(user_id)
+
+
+def resolve_customer(user):
+	"""
+	Map a user to CustomerRef(id, membership) through the shared cache, or
+	None when the user is anonymous or has no customer. Entries are dropped
+	by the Customer save/delete signals.
+	"""
+	if user is None or not user.is_authenticated:
+		return None
+
+	key = get_customer_cache_key(user.pk)
+	customer = cache.get(key)
+	if customer is None:
+		customer = Customer.objects.filter(user_id=user.pk).values_list("id", "membership").first()
+		if customer is None:
+			return None
+		cache.set(key, customer, timeout=getattr(settings, "STORE_CUSTOMER_CACHE_TIMEOUT", 60 * 60))
+
+	return CustomerRef(*customer)
+
+
+class CustomerMiddleware:
+	"""
+	Expose the current user's customer as `request.customer`. It is resolved
+	on first access (after DRF authentication has set request.user) and
+	memoized for the rest of the request. Falsy when there is no customer.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		# Lazy, so setting it needs no thread hop under ASGI.
+		request.customer = SimpleLazyObject(lambda: resolve_customer(getattr(request, "user", None)))
+		return self.get_response(request)
+
+
+class ReplicaPinningMiddleware:
+	"""
+	Read-your-writes across requests for PrimaryReplicaRouter: once a request
+	writes, a cookie keeps that client's catalog reads on primary for
+	STORE_REPLICA_PIN_SECONDS while the replicas catch up.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		if iscoroutinefunction(self):
+			return self.__acall__(request)
+		if not get_replicas():
+			return self.get_response(request)
+
+		with pinning(self.is_pinned(request)):
+			response = self.get_response(request)
+			self.remember_write(response)
+		return response
+
+	async def __acall__(self, request):
+		if not get_replicas():
+			return await self.get_response(request)
+
+		with pinning(self.is_pinned(request)):
+			response = await self.get_response(request)
+			self.remember_write(response)
+		return response
+
+	def is_pinned(self, request):
+		return PIN_COOKIE in request.COOKIES or request.method not in ("GET", "HEAD", "OPTIONS")
+
+	def remember_write(self, response):
+		if has_written():
+			response.set_cookie(
+				PIN_COOKIE,
+				"1",
+				max_age=getattr(settings, "STORE_REPLICA_PIN_SECONDS", 5),
+				httponly=True,
+				samesite="Lax",
+			)
+
+
+class QueryInstrumentationMiddleware:
+	"""
+	For a sample (STORE_QUERY_SAMPLE_RATE) of requests, count the queries and
+	database time, and flag statements repeated more than
+	STORE_QUERY_REPEAT_THRESHOLD times, the signature of an N+1. Results go
+	to a Server-Timing header and one JSON log line per sampled request.
+	"""
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		self.sample_rate = getattr(settings, "STORE_QUERY_SAMPLE_RATE", 0.01)
+		self.threshold = getattr(settings, "STORE_QUERY_REPEAT_THRESHOLD", 5)
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		if iscoroutinefunction(self):
+			return self.__acall__(request)
+		if random.random() >= self.sample_rate:
+			return self.get_response(request)
+
+		recorder, token = start_recording()
+		start = time.perf_counter()
+		try:
+			response = self.get_response(request)
+		finally:
+			stop_recording(token)
+		self.report(request, response, recorder, time.perf_counter() - start)
+		return response
+
+	async def __acall__(self, request):
+		if random.random() >= self.sample_rate:
+			return await self.get_response(request)
+
+		recorder, token = start_recording()
+		start = time.perf_counter()
+		try:
+			response = await self.get_response(request)
+		finally:
+			stop_recording(token)
+		self.report(request, response, recorder, time.perf_counter() - start)
+		return response
+
+	def report(self, request, response, recorder, elapsed):
+		repeated = recorder.repeated(self.threshold)
+
+		timings = [f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"', f"total;dur={elapsed * 1000:.1f}"]
+		if repeated:
+			timings.append(f'nplusone;desc="{len(repeated)} repeated statements"')
+		if response.has_header("Server-Timing"):
+			timings.insert(0, response["Server-Timing"])
+		response["Server-Timing"] = ", ".join(timings)
+
+		logger.log(
+			logging.WARNING if repeated else logging.INFO,
+			json.dumps({
+				"method": request.method,
+				"path": request.path,
+				"status": response.status_code,
+				"queries": recorder.count,
+				"db_ms": round(recorder.duration * 1000, 2),
+				"total_ms": round(elapsed * 1000, 2),
+				"repeated": repeated,
+			}),
+		)
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0005_alter_order_options"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["unit_price", "id"], name="product_price_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["last_update", "id"], name="product_update_keyset_idx"
+            ),
+        ),
+    ]
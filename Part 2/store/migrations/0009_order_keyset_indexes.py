@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0008_collection_products_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["customer", "placed_at"], name="order_customer_placed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["placed_at", "id"], name="order_placed_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0009_order_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="summary",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
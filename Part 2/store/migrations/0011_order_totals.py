@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:11
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def compute_totals(apps, schema_editor):
+    Order = apps.get_model("store", "Order")
+    OrderItem = apps.get_model("store", "OrderItem")
+    total_field = models.DecimalField(max_digits=12, decimal_places=2)
+
+    items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    total = items.annotate(total=Sum(F("quantity") * F("unit_price"), output_field=total_field))
+    count = items.annotate(count=Sum("quantity"))
+    Order.objects.update(
+        total_amount=Coalesce(Round(Subquery(total.values("total")), 2), Value(0), output_field=total_field),
+        item_count=Coalesce(Subquery(count.values("count")), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0010_order_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.DecimalField(
+                db_index=True,
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=12,
+            ),
+        ),
+        migrations.RunPython(compute_totals, migrations.RunPython.noop),
+    ]
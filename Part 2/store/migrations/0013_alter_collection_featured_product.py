@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0012_outbox_event"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="collection",
+            name="featured_product",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="store.product",
+            ),
+        ),
+    ]
@@ -1,11 +1,22 @@
+from collections import Counter
+
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+from django.utils.text import Truncator
 
 import uuid
 
 from core.models import User
+from store.cache import bump_generation
 from django.contrib import admin
 
+
+PRICE_TOTAL_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
 class Promotion(models.Model):
 	description = models.CharField(max_length=500)
 	discount = models.FloatField()
@@ -18,8 +29,33 @@ class Promotion(models.Model):
 		verbose_name_plural = "Promotions"
 
 
+class CollectionQuerySet(models.QuerySet):
+	def add_products_count(self, counts):
+		"""Apply {collection_id: delta} to the stored products_count."""
+		changed = False
+		for collection_id, delta in counts.items():
+			if collection_id is not None and delta:
+				self.filter(pk=collection_id).update(products_count=F("products_count") + delta)
+				changed = True
+		if changed:
+			bump_generation(Collection)
+
+	def recount_products(self):
+		products = (
+			Product.objects.filter(collection=OuterRef("pk"))
+			.order_by()
+			.values("collection")
+			.annotate(count=Count("id"))
+			.values("count")
+		)
+		rows = self.update(products_count=Coalesce(Subquery(products), 0))
+		bump_generation(Collection)
+		return rows
+
+
 class Collection(models.Model):
 	title = models.CharField(max_length=200)
+	products_count = models.PositiveIntegerField(default=0, editable=False)
 	featured_product = models.ForeignKey(
 		to="Product",
 		on_delete=models.SET_NULL,
@@ -28,6 +64,8 @@ class Collection(models.Model):
 		related_name="+"
 	)
 
+	objects = CollectionQuerySet.as_manager()
+
 	def __str__(self):
 		return f"{self.title}"
 
@@ -37,6 +75,52 @@ class Collection(models.Model):
 		ordering = ["-title"]
 
 
+class ProductQuerySet(models.QuerySet):
+	"""
+	Keeps Collection.products_count and the response cache generation right
+	on the paths that skip signals.
+	"""
+
+	def bulk_create(self, objs, *args, **kwargs):
+		with transaction.atomic(using=self.db):
+			objs = super().bulk_create(objs, *args, **kwargs)
+			bump_generation(Product)
+
+			if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+				# Which rows were really inserted is unknown, so count again.
+				collection_ids = {obj.collection_id for obj in objs}
+				Collection.objects.filter(pk__in=collection_ids).recount_products()
+			else:
+				Collection.objects.add_products_count(Counter(obj.collection_id for obj in objs))
+
+		return objs
+
+	def update(self, **kwargs):
+		# auto_now only fires on save(); ETags and Last-Modified rely on it.
+		kwargs.setdefault("last_update", timezone.now())
+
+		if "collection" not in kwargs and "collection_id" not in kwargs:
+			rows = super().update(**kwargs)
+		else:
+			with transaction.atomic(using=self.db):
+				collection_ids = set(self.values_list("collection_id", flat=True).distinct())
+				rows = super().update(**kwargs)
+
+				target = kwargs.get("collection", kwargs.get("collection_id"))
+				if isinstance(target, Collection):
+					target = target.pk
+
+				if isinstance(target, int):
+					Collection.objects.filter(pk__in=collection_ids | {target}).recount_products()
+				else:
+					# An expression (e.g. from bulk_update) can move rows anywhere.
+					Collection.objects.recount_products()
+
+		# Outside a transaction the bump runs at once, so it must follow the write.
+		bump_generation(Product)
+		return rows
+
+
 class Product(models.Model):
 	title = models.CharField(max_length=150)
 	slug = models.SlugField()
@@ -59,6 +143,17 @@ class Product(models.Model):
 		related_name="product_promotions"
 	)
 
+	objects = ProductQuerySet.as_manager()
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember where the row lives so a move can adjust both collection counters.
+		# Deferred loads leave it to the pre_save fallback.
+		if "collection_id" in field_names:
+			instance._loaded_collection_id = instance.collection_id
+		return instance
+
 	def __str__(self):
 		return f"{self.title} is in {self.collection}"
 
@@ -66,6 +161,10 @@ class Product(models.Model):
 		verbose_name = "Product"
 		verbose_name_plural = "Products"
 		ordering = ["-title"]
+		indexes = [
+			models.Index(fields=["unit_price", "id"], name="product_price_keyset_idx"),
+			models.Index(fields=["last_update", "id"], name="product_update_keyset_idx"),
+		]
 
 
 class Customer(models.Model):
@@ -106,6 +205,46 @@ class Customer(models.Model):
 		ordering = ["user__first_name", "user__last_name"]
 
 
+class OrderQuerySet(models.QuerySet):
+	@staticmethod
+	def actual_totals():
+		"""Expressions recomputing total_amount and item_count from the order items."""
+		items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+		total = items.annotate(total=Sum(F("quantity") * F("unit_price"), output_field=PRICE_TOTAL_FIELD))
+		count = items.annotate(count=Sum("quantity"))
+		return {
+			"total_amount": Coalesce(
+				Round(Subquery(total.values("total")), 2), Value(0), output_field=PRICE_TOTAL_FIELD
+			),
+			"item_count": Coalesce(Subquery(count.values("count")), Value(0)),
+		}
+
+	def refresh_totals(self):
+		return self.update(**self.actual_totals())
+
+	def with_drifted_totals(self):
+		"""Orders whose stored totals disagree with their items."""
+		actual = self.actual_totals()
+		return self.annotate(
+			actual_total_amount=actual["total_amount"], actual_item_count=actual["item_count"]
+		).exclude(total_amount=F("actual_total_amount"), item_count=F("actual_item_count"))
+
+	def refresh_summaries(self):
+		"""Rewrite the stored summary of every order in the queryset (3 queries)."""
+		items = OrderItem.objects.select_related("product").only("order_id", "product__title").order_by("id")
+		orders = list(
+			self.select_related("customer__user")
+			.prefetch_related(Prefetch("order_items", queryset=items))
+			.only("id", "customer__id", "customer__user__first_name")
+		)
+		for order in orders:
+			order.summary = Order.summarize(
+				[item.product.title for item in order.order_items.all()],
+				order.customer.user.first_name,
+			)
+		return Order.objects.bulk_update(orders, ["summary"])
+
+
 class Order(models.Model):
 	PAYMENT_STATUS_PENDING = "P"
 	PAYMENT_STATUS_COMPLETE = "C"
@@ -128,19 +267,31 @@ class Order(models.Model):
 		on_delete=models.PROTECT,
 		related_name="orders"
 	)
+	# Denormalized "[titles] is ordered by name", kept up to date on write
+	# so rendering an order needs no queries.
+	summary = models.CharField(max_length=255, blank=True, editable=False)
+	# Sum of quantity * unit_price and of quantity over the order items,
+	# maintained on every order item write.
+	total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, db_index=True)
+	item_count = models.PositiveIntegerField(default=0, editable=False)
 
-	def __str__(self):
-		orderitems = self.order_items.filter()
-		order_products = []
+	objects = OrderQuerySet.as_manager()
 
-		for order_product in orderitems:
-			order_products.append(order_product.product.title)
+	def __str__(self):
+		return self.summary or f"Order {self.pk}"
 
-		return f"{order_products} is ordered by {self.customer.user.first_name}"
+	@staticmethod
+	def summarize(product_titles, first_name):
+		summary = f"{product_titles} is ordered by {first_name}"
+		return Truncator(summary).chars(255)
 
 	class Meta:
 		verbose_name = "Order"
 		verbose_name_plural = "Orders"
+		indexes = [
+			models.Index(fields=["customer", "placed_at"], name="order_customer_placed_idx"),
+			models.Index(fields=["placed_at", "id"], name="order_placed_keyset_idx"),
+		]
 		permissions = [
 			("cancel_order", "Can cancel order")
 		]
@@ -185,10 +336,23 @@ class Address(models.Model):
 		verbose_name_plural = "Addresses"
 
 
+class CartQuerySet(models.QuerySet):
+	def with_items(self):
+		"""Prefetch items with their products and annotate the cart total_price."""
+		total_price = Sum(F("cart_items__quantity") * F("cart_items__product__unit_price"))
+		return self.prefetch_related(
+			Prefetch("cart_items", queryset=CartItem.objects.with_total_price())
+		).annotate(
+			total_price=Coalesce(total_price, Value(0), output_field=PRICE_TOTAL_FIELD)
+		)
+
+
 class Cart(models.Model):
 	id = models.UUIDField(primary_key=True, default=uuid.uuid4)
 	created_at = models.DateTimeField(auto_now_add=True)
 
+	objects = CartQuerySet.as_manager()
+
 	def __str__(self):
 		return f"{self.id}"
 
@@ -197,6 +361,83 @@ class Cart(models.Model):
 		verbose_name_plural = "Carts"
 
 
+class CartItemQuerySet(models.QuerySet):
+	def with_total_price(self):
+		return self.select_related("product").annotate(
+			total_price=ExpressionWrapper(F("quantity") * F("product__unit_price"), output_field=PRICE_TOTAL_FIELD)
+		)
+
+	def add_items(self, cart_id, items, replace=False):
+		"""
+		Add (product_id, quantity) pairs to a cart, creating missing rows and
+		incrementing existing ones in a single INSERT ... ON CONFLICT DO UPDATE,
+		so concurrent adds never lose an increment. With `replace` existing
+		quantities are overwritten instead. Returns the affected items.
+		"""
+		counts = Counter()
+		for product_id, quantity in items:
+			counts[product_id] += quantity
+		if not counts:
+			return []
+
+		connection = transaction.get_connection(self.db)
+		if connection.vendor in ("sqlite", "postgresql") and connection.features.can_return_rows_from_bulk_insert:
+			return self._upsert(connection, cart_id, counts, replace)
+		return self._update_or_create(cart_id, counts, replace)
+
+	def _upsert(self, connection, cart_id, counts, replace):
+		opts = self.model._meta
+		quote = connection.ops.quote_name
+		table = quote(opts.db_table)
+		cart_column = quote(opts.get_field("cart").column)
+		product_column = quote(opts.get_field("product").column)
+		quantity_column = quote(opts.get_field("quantity").column)
+		cart_value = opts.get_field("cart").get_db_prep_value(cart_id, connection)
+
+		rows = ", ".join(["(%s, %s, %s)"] * len(counts))
+		params = []
+		for product_id, quantity in counts.items():
+			params += [cart_value, product_id, quantity]
+
+		quantity = f"excluded.{quantity_column}"
+		if not replace:
+			quantity = f"{table}.{quantity_column} + {quantity}"
+
+		sql = (
+			f"INSERT INTO {table} ({cart_column}, {product_column}, {quantity_column}) VALUES {rows} "
+			f"ON CONFLICT ({cart_column}, {product_column}) "
+			f"DO UPDATE SET {quantity_column} = {quantity} "
+			f"RETURNING {quote(opts.pk.column)}, {product_column}, {quantity_column}"
+		)
+		with connection.cursor() as cursor:
+			cursor.execute(sql, params)
+			returned = cursor.fetchall()
+
+		items = []
+		for pk, product_id, quantity in returned:
+			item = self.model(id=pk, cart_id=cart_id, product_id=product_id, quantity=quantity)
+			item._state.adding = False
+			item._state.db = self.db
+			items.append(item)
+		return items
+
+	def _update_or_create(self, cart_id, counts, replace):
+		# Portable fallback: increment with F(), insert if nothing was there,
+		# and increment again if a concurrent insert won the race.
+		for product_id, quantity in counts.items():
+			lookup = self.filter(cart_id=cart_id, product_id=product_id)
+			new_quantity = quantity if replace else F("quantity") + quantity
+			if lookup.update(quantity=new_quantity):
+				continue
+			try:
+				with transaction.atomic(using=self.db):
+					self.create(cart_id=cart_id, product_id=product_id, quantity=quantity)
+			except IntegrityError:
+				lookup.update(quantity=new_quantity)
+
+		return list(self.filter(cart_id=cart_id, product_id__in=counts))
+
+
 class CartItem(models.Model):
 	cart = models.ForeignKey(
 		to=Cart,
@@ -210,10 +451,46 @@ class CartItem(models.Model):
 	)
 	quantity = models.PositiveSmallIntegerField()
 
+	objects = CartItemQuerySet.as_manager()
+
 	def __str__(self):
 		return f"{self.product.title}"
 
 	class Meta:
 		verbose_name = "CartItem"
 		verbose_name_plural = "CartItems"
-		unique_together = [["cart", "product"]]
\ No newline at end of file
+		unique_together = [["cart", "product"]]
+
+
+class OutboxEvent(models.Model):
+	STATUS_PENDING = "P"
+	STATUS_DONE = "D"
+	STATUS_DEAD = "X"
+
+	STATUS_CHOICES = [
+		(STATUS_PENDING, "Pending"),
+		(STATUS_DONE, "Done"),
+		(STATUS_DEAD, "Dead"),
+	]
+
+	topic = models.CharField(max_length=100)
+	payload = models.JSONField(default=dict)
+	status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+	attempts = models.PositiveIntegerField(default=0)
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	available_at = models.DateTimeField(default=timezone.now)
+	processed_at = models.DateTimeField(null=True, blank=True)
+	# Claim columns, so workers without SKIP LOCKED (SQLite) never share a batch.
+	claimed_by = models.CharField(max_length=64, blank=True)
+	claimed_until = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self):
+		return f"{self.topic} #{self.pk}"
+
+	class Meta:
+		verbose_name = "OutboxEvent"
+		verbose_name_plural = "OutboxEvents"
+		indexes = [
+			models.Index(fields=["status", "available_at"], name="outbox_pending_idx"),
+		]
@@ -0,0 +1,89 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from store.models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = defaultdict(list)
+
+
+def handler(topic):
+	"""Register a function to receive the payload of every `topic` event."""
+	def register(func):
+		HANDLERS[topic].append(func)
+		return func
+	return register
+
+
+def publish(topic, payload):
+	"""
+	Record an event. Call it inside the transaction that makes the change, so
+	the event exists if and only if the change was committed.
+	"""
+	return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def claim_batch(batch_size=100, lease=timedelta(minutes=5)):
+	"""Claim up to `batch_size` due events for this worker for `lease`."""
+	now = timezone.now()
+	token = uuid.uuid4().hex
+	due = OutboxEvent.objects.filter(
+		Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+		status=OutboxEvent.STATUS_PENDING,
+		available_at__lte=now,
+	).order_by("id")
+
+	with transaction.atomic():
+		if connection.features.has_select_for_update_skip_locked:
+			pks = list(due.select_for_update(skip_locked=True).values_list("pk", flat=True)[:batch_size])
+			claimed = OutboxEvent.objects.filter(pk__in=pks)
+		else:
+			# SQLite serializes writers, so one UPDATE ... WHERE id IN (...) is the claim.
+			claimed = OutboxEvent.objects.filter(pk__in=due.values("pk")[:batch_size])
+		claimed.update(claimed_by=token, claimed_until=now + lease)
+
+	return list(OutboxEvent.objects.filter(claimed_by=token).order_by("id"))
+
+
+def dispatch(events, max_attempts=5, backoff=timedelta(seconds=10)):
+	"""
+	Hand every event to its handlers. Failures are retried with exponential
+	backoff and dead-lettered after `max_attempts`. Returns (done, failed).
+	"""
+	now = timezone.now()
+	done, failed = [], []
+
+	for event in events:
+		try:
+			for func in HANDLERS.get(event.topic, []):
+				func(event.payload)
+		except Exception as exc:
+			logger.exception("Outbox event %s (%s) failed", event.pk, event.topic)
+			event.attempts += 1
+			event.last_error = f"{type(exc).__name__}: {exc}"
+			if event.attempts >= max_attempts:
+				event.status = OutboxEvent.STATUS_DEAD
+			else:
+				event.available_at = now + backoff * 2 ** (event.attempts - 1)
+			failed.append(event)
+		else:
+			event.status = OutboxEvent.STATUS_DONE
+			event.processed_at = now
+			done.append(event)
+
+		event.claimed_by = ""
+		event.claimed_until = None
+
+	OutboxEvent.objects.bulk_update(
+		done + failed,
+		["status", "attempts", "last_error", "available_at", "processed_at", "claimed_by", "claimed_until"],
+	)
+	return done, failed
@@ -1,5 +1,122 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
 
 
 class DefaultPagination(PageNumberPagination):
-	page_size = 100
\ No newline at end of file
+	page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+	"""
+	Cursor pagination keyed on (ordering field, tiebreaker).
+
+	Every page is a range scan on a composite index, so there is no COUNT(*)
+	and no OFFSET: page 10,000 costs the same as page 1. Only the first
+	ordering field is used as the key, the tiebreaker keeps it unique.
+	"""
+	page_size = 100
+	ordering = "id"
+	tiebreaker = "id"
+	display_page_controls = True
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.request = request
+		self.page_size = self.get_page_size(request)
+		if not self.page_size:
+			return None
+
+		self.base_url = request.build_absolute_uri()
+		self.ordering = self.get_ordering(request, queryset, view)
+		self.cursor = self.decode_cursor(request)
+		self.keys = self.get_keys()
+
+		reverse = self.cursor is not None and self.cursor.reverse
+		ordering = self.reverse_keys(self.keys) if reverse else self.keys
+		queryset = queryset.order_by(*ordering)
+
+		if self.cursor is not None:
+			queryset = queryset.filter(self.get_position_filter(ordering, self.cursor.position))
+
+		results = list(queryset[:self.page_size + 1])
+		has_more = len(results) > self.page_size
+		self.page = results[:self.page_size]
+
+		if reverse:
+			self.page.reverse()
+			self.has_next = True
+			self.has_previous = has_more
+		else:
+			self.has_next = has_more
+			self.has_previous = self.cursor is not None
+
+		return self.page
+
+	def get_ordering(self, request, queryset, view):
+		# Unlike CursorPagination, an OrderingFilter without ?ordering= falls back to `ordering`.
+		for backend in getattr(view, "filter_backends", []):
+			if hasattr(backend, "get_ordering"):
+				ordering = backend().get_ordering(request, queryset, view)
+				if ordering:
+					return tuple(ordering)
+
+		if isinstance(self.ordering, str):
+			return (self.ordering,)
+		return tuple(self.ordering)
+
+	def get_keys(self):
+		key = self.ordering[0]
+		tiebreaker = f"-{self.tiebreaker}" if key.startswith("-") else self.tiebreaker
+		if key.lstrip("-") == self.tiebreaker:
+			return (key,)
+		return (key, tiebreaker)
+
+	def reverse_keys(self, keys):
+		return tuple(key[1:] if key.startswith("-") else f"-{key}" for key in keys)
+
+	def get_position_filter(self, ordering, position):
+		try:
+			values = json.loads(position)
+		except (TypeError, ValueError):
+			raise NotFound(self.invalid_cursor_message)
+
+		if not isinstance(values, list) or len(values) != len(ordering):
+			raise NotFound(self.invalid_cursor_message)
+
+		# (a, b) > (x, y)  ==  a >= x AND (a > x OR (a = x AND b > y)).
+		# The redundant bound on the leading key lets the planner seek the index.
+		condition = Q()
+		equal = Q()
+		for key, value in zip(ordering, values):
+			field = key.lstrip("-")
+			lookup = "lt" if key.startswith("-") else "gt"
+			condition |= equal & Q(**{f"{field}__{lookup}": value})
+			equal &= Q(**{field: value})
+
+		leading = ordering[0]
+		lookup = "lte" if leading.startswith("-") else "gte"
+		return Q(**{f"{leading.lstrip('-')}__{lookup}": values[0]}) & condition
+
+	def get_position(self, instance):
+		return json.dumps([str(getattr(instance, key.lstrip("-"))) for key in self.keys])
+
+	def get_next_link(self):
+		if not self.has_next or not self.page:
+			return None
+		cursor = Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1]))
+		return self.encode_cursor(cursor)
+
+	def get_previous_link(self):
+		if not self.has_previous or not self.page:
+			return None
+		cursor = Cursor(offset=0, reverse=True, position=self.get_position(self.page[0]))
+		return self.encode_cursor(cursor)
+
+
+
+class OrderPagination(KeysetPagination):
+	page_size = 50
+	ordering = "-placed_at"
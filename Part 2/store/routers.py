@@ -0,0 +1,83 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Catalog models, read-mostly and safe to serve slightly behind primary.
+REPLICATED_MODELS = {"store.product", "store.collection", "store.promotion", "tags.tag", "tags.taggeditem"}
+
+_scoped = ContextVar("store_pinning_scope", default=False)
+_pinned = ContextVar("store_pinned_to_primary", default=False)
+_wrote = ContextVar("store_wrote", default=False)
+
+
+def get_replicas():
+	return getattr(settings, "STORE_READ_REPLICAS", [])
+
+
+def pin_to_primary():
+	_pinned.set(True)
+
+
+def is_pinned():
+	return _pinned.get()
+
+
+def has_written():
+	return _wrote.get()
+
+
+@contextmanager
+def pinning(pinned=False):
+	"""
+	Scope pinning and write tracking to one unit of work, such as a request.
+	Writes outside any scope (commands, workers, the shell) pin nothing.
+	"""
+	scoped_token = _scoped.set(True)
+	pinned_token = _pinned.set(pinned)
+	wrote_token = _wrote.set(False)
+	try:
+		yield
+	finally:
+		_scoped.reset(scoped_token)
+		_pinned.reset(pinned_token)
+		_wrote.reset(wrote_token)
+
+
+class PrimaryReplicaRouter:
+	"""
+	Send catalog reads to a random replica from STORE_READ_REPLICAS, and
+	everything else to primary. Reads stay on primary inside an atomic block
+	and once the current request (or, through ReplicaPinningMiddleware, the
+	current client) has written, so a writer always reads its own writes.
+	"""
+
+	def db_for_read(self, model, **hints):
+		replicas = get_replicas()
+		if not replicas or model._meta.label_lower not in REPLICATED_MODELS:
+			return None
+		if is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+			return DEFAULT_DB_ALIAS
+		return random.choice(replicas)
+
+	def db_for_write(self, model, **hints):
+		if _scoped.get():
+			_wrote.set(True)
+			pin_to_primary()
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1, obj2, **hints):
+		# Replicas are copies of primary, so rows relate across them freely.
+		databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+		if obj1._state.db in databases and obj2._state.db in databases:
+			return True
+		return None
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		# Replicas get their schema from primary along with the data.
+		if db in get_replicas():
+			return False
+		return None
@@ -0,0 +1,152 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+
+# SQLite: an external-content FTS5 table kept in sync by triggers, so bulk
+# inserts and queryset updates are indexed too.
+SQLITE_INDEX = "store_product_fts"
+
+SQLITE_INSTALL = [
+	f"""
+	CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_INDEX} USING fts5(
+		title, description, content='store_product', content_rowid='id'
+	)
+	""",
+	f"""
+	CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_ai AFTER INSERT ON store_product BEGIN
+		INSERT INTO {SQLITE_INDEX}(rowid, title, description)
+		VALUES (new.id, new.title, new.description);
+	END
+	""",
+	f"""
+	CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_ad AFTER DELETE ON store_product BEGIN
+		INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}, rowid, title, description)
+		VALUES ('delete', old.id, old.title, old.description);
+	END
+	""",
+	f"""
+	CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_au AFTER UPDATE OF title, description ON store_product BEGIN
+		INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}, rowid, title, description)
+		VALUES ('delete', old.id, old.title, old.description);
+		INSERT INTO {SQLITE_INDEX}(rowid, title, description)
+		VALUES (new.id, new.title, new.description);
+	END
+	""",
+	f"INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+	f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_ai",
+	f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_ad",
+	f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_au",
+	f"DROP TABLE IF EXISTS {SQLITE_INDEX}",
+]
+
+# Postgres: a generated tsvector column, title weighted above description.
+POSTGRES_INSTALL = [
+	"""
+	ALTER TABLE store_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+	GENERATED ALWAYS AS (
+		setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+		setweight(to_tsvector('english', coalesce(description, '')), 'B')
+	) STORED
+	""",
+	"CREATE INDEX IF NOT EXISTS store_product_search_idx ON store_product USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+	"DROP INDEX IF EXISTS store_product_search_idx",
+	"ALTER TABLE store_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def is_supported(conn=connection):
+	return conn.vendor in ("sqlite", "postgresql")
+
+
+def install(conn=connection):
+	"""Create (or repair) the product search index and fill it."""
+	statements = {"sqlite": SQLITE_INSTALL, "postgresql": POSTGRES_INSTALL}.get(conn.vendor, [])
+	with conn.cursor() as cursor:
+		for statement in statements:
+			cursor.execute(statement)
+
+
+def is_installed(conn=connection):
+	"""Whether the index and everything that keeps it in sync exist."""
+	if conn.vendor == "sqlite":
+		names = [SQLITE_INDEX, f"{SQLITE_INDEX}_ai", f"{SQLITE_INDEX}_ad", f"{SQLITE_INDEX}_au"]
+		with conn.cursor() as cursor:
+			cursor.execute(
+				f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names
+			)
+			return cursor.fetchone()[0] == len(names)
+
+	if conn.vendor == "postgresql":
+		with conn.cursor() as cursor:
+			cursor.execute(
+				"SELECT 1 FROM information_schema.columns"
+				" WHERE table_name = 'store_product' AND column_name = 'search_vector'"
+			)
+			return cursor.fetchone() is not None
+
+	return True
+
+
+def ensure_installed(conn=connection):
+	"""Install the index unless it is complete, e.g. after a migration dropped the triggers."""
+	if "store_product" in conn.introspection.table_names() and not is_installed(conn):
+		install(conn)
+
+
+def uninstall(conn=connection):
+	statements = {"sqlite": SQLITE_UNINSTALL, "postgresql": POSTGRES_UNINSTALL}.get(conn.vendor, [])
+	with conn.cursor() as cursor:
+		for statement in statements:
+			cursor.execute(statement)
+
+
+def rebuild(conn=connection):
+	"""
+	Reinstall the index from scratch. Triggers that a migration dropped are
+	restored by ensure_installed() on post_migrate; this also refills it.
+	"""
+	uninstall(conn)
+	install(conn)
+
+
+def get_tokens(terms):
+	return [token for term in terms for token in re.findall(r"\w+", term)]
+
+
+def search(queryset, terms):
+	"""
+	Filter a Product queryset down to rows matching every term (as a prefix)
+	and annotate `search_rank`, ordered best match first.
+	"""
+	tokens = get_tokens(terms)
+	if not tokens:
+		return queryset.none()
+
+	if connections[queryset.db].vendor == "sqlite":
+		query = " ".join(f'"{token}"*' for token in tokens)
+		matches = RawSQL(f"SELECT rowid FROM {SQLITE_INDEX} WHERE {SQLITE_INDEX} MATCH %s", [query])
+		rank = RawSQL(
+			f"SELECT bm25({SQLITE_INDEX}, 10.0, 1.0) FROM {SQLITE_INDEX}"
+			f" WHERE {SQLITE_INDEX} MATCH %s AND rowid = store_product.id",
+			[query],
+			output_field=FloatField(),
+		)
+		return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by("search_rank")
+
+	query = " & ".join(f"{token}:*" for token in tokens)
+	matches = RawSQL(
+		"store_product.search_vector @@ to_tsquery('english', %s)", [query], output_field=BooleanField()
+	)
+	rank = RawSQL(
+		"ts_rank(store_product.search_vector, to_tsquery('english', %s))", [query], output_field=FloatField()
+	)
+	return queryset.filter(matches).annotate(search_rank=rank).order_by("-search_rank")
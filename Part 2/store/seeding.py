@@ -0,0 +1,341 @@
+import itertools
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import User
+from likes.models import LikedItem
+from store.cache import bump_generation
+from store.models import (
+	Collection, Product, Promotion, Customer, Order, OrderItem, Cart, CartItem,
+)
+from store.user_import import batched
+from tags.models import Tag, TaggedItem
+
+
+# Rows per unit of --scale; scale 1 is roughly a million rows in all.
+COUNTS = {
+	"collections": 100,
+	"promotions": 200,
+	"products": 50_000,
+	"customers": 25_000,
+	"tags": 1000,
+	"carts": 40_000,
+	"orders": 150_000,
+	"liked_items": 150_000,
+	"tagged_items": 150_000,
+}
+
+ADJECTIVES = (
+	"organic fresh classic smoked roasted spicy sweet crunchy creamy wild golden "
+	"rustic italian french smoky frozen dried salted mild bold premium light dark"
+).split()
+NOUNS = (
+	"coffee tea juice bread flour rice pasta sauce cheese butter yogurt honey "
+	"olive oil vinegar soap shampoo towel napkin plate bowl mug kettle pan grill "
+	"almonds cashews granola cereal chocolate cookies crackers salsa pesto jam"
+).split()
+FIRST_NAMES = (
+	"James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth William "
+	"Barbara Richard Susan Joseph Jessica Thomas Sarah Charles Karen Daniel Nancy"
+).split()
+LAST_NAMES = (
+	"Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez "
+	"Hernandez Lopez Gonzalez Wilson Anderson Thomas Taylor Moore Jackson Martin"
+).split()
+
+MEMBERSHIPS = [Customer.MEMBERSHIP_BRONZE, Customer.MEMBERSHIP_SILVER, Customer.MEMBERSHIP_GOLD]
+PAYMENT_STATUSES = [Order.PAYMENT_STATUS_COMPLETE, Order.PAYMENT_STATUS_PENDING, Order.PAYMENT_STATUS_FAILED]
+
+
+class Zipf:
+	"""Draws from `population`, the item at rank k with probability proportional to 1 / k**exponent."""
+
+	def __init__(self, rng, population, exponent=1.0):
+		self.rng = rng
+		self.population = population
+		self.cum_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, len(population) + 1)))
+
+	def sample(self, k, rng=None):
+		return (rng or self.rng).choices(self.population, cum_weights=self.cum_weights, k=k)
+
+	def draw(self):
+		return self.sample(1)[0]
+
+
+class StoreSeeder:
+	"""
+	Fill the store with synthetic, deterministic data for load testing:
+	the same `seed` and `scale` always produce the same rows (ids aside).
+
+	Product popularity (orders, carts, likes) and the collection sizes are
+	Zipfian, cart and order sizes follow a power law and a few customers
+	place most of the orders. Everything goes through bulk_create in
+	`batch_size` batches, one transaction each; the post_save signals don't
+	fire for bulk inserts, so customers, order totals and summaries are
+	written here. Seeded customers are not signups and publish no
+	customer.created outbox events.
+	"""
+
+	def __init__(self, scale=1, seed=0, batch_size=10_000, password=None, report=None):
+		self.scale = scale
+		self.seed = seed
+		self.batch_size = batch_size
+		self.rng = random.Random(seed)
+		# One hash for every user: hashing per row would take longer than the whole run.
+		self.password = make_password(password)
+		self.report = report
+		self.counts = Counter()
+		self.start = None
+
+	def count(self, name):
+		return max(1, round(COUNTS[name] * self.scale))
+
+	def run(self):
+		"""Seed everything and return the number of rows created per model."""
+		self.start = time.perf_counter()
+		self.product_type = ContentType.objects.get_for_model(Product)
+
+		self.seed_catalog()
+		self.seed_customers()
+		self.seed_carts()
+		self.seed_orders()
+		self.seed_likes()
+		self.seed_tags()
+
+		# The bulk inserts above skip the signals that invalidate cached responses.
+		for model in (Collection, Product, Promotion):
+			bump_generation(model)
+		return self.counts
+
+	def insert(self, model, objs, keep=None):
+		"""bulk_create `objs` in batches and return keep(obj) for every created row."""
+		kept = []
+		for batch in batched(objs, self.batch_size):
+			with transaction.atomic():
+				created = model.objects.bulk_create(batch, batch_size=self.batch_size)
+			if keep:
+				kept += map(keep, created)
+			self.created(model, len(created))
+		return kept
+
+	def insert_rows(self, model, fields, rows):
+		"""
+		INSERT tuples of `fields` values in batches. For the big link tables,
+		building and preparing model instances costs more than the insert.
+		"""
+		for batch in batched(rows, self.batch_size):
+			with transaction.atomic():
+				self.write_rows(model, fields, batch)
+
+	def write_rows(self, model, fields, rows):
+		connection = transaction.get_connection()
+		quote = connection.ops.quote_name
+		opts = model._meta
+		columns = ", ".join(quote(opts.get_field(name).column) for name in fields)
+		placeholders = ", ".join(["%s"] * len(fields))
+		with connection.cursor() as cursor:
+			cursor.executemany(f"INSERT INTO {quote(opts.db_table)} ({columns}) VALUES ({placeholders})", rows)
+		self.created(model, len(rows))
+
+	def created(self, model, rows):
+		self.counts[model._meta.label] += rows
+		if self.report:
+			self.report(model._meta.label, self.counts[model._meta.label], self.elapsed())
+
+	def elapsed(self):
+		return time.perf_counter() - self.start
+
+	def shuffled(self, population):
+		# Popularity ranks must not follow primary keys, or "popular" means "old".
+		population = list(population)
+		self.rng.shuffle(population)
+		return population
+
+	def seed_catalog(self):
+		rng = self.rng
+
+		collection_ids = self.insert(
+			Collection,
+			(
+				Collection(title=f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {n}")
+				for n in range(self.count("collections"))
+			),
+			keep=lambda collection: collection.pk,
+		)
+		promotion_ids = self.insert(
+			Promotion,
+			(
+				Promotion(description=f"Promotion {n}", discount=rng.choice([0.05, 0.1, 0.15, 0.2, 0.25, 0.5]))
+				for n in range(self.count("promotions"))
+			),
+			keep=lambda promotion: promotion.pk,
+		)
+
+		collections = Zipf(rng, self.shuffled(collection_ids), exponent=0.8)
+		self.products = self.insert(
+			Product,
+			(self.product(n, collection_id) for n, collection_id in enumerate(collections.sample(self.count("products")))),
+			keep=lambda product: (product.pk, product.unit_price, product.title),
+		)
+		self.prices = {pk: price for pk, price, title in self.products}
+		self.titles = {pk: title for pk, price, title in self.products}
+		self.popularity = Zipf(rng, self.shuffled(self.prices), exponent=1.1)
+
+		# About one product in ten is on one or two promotions.
+		through = Product.promotions.through
+		self.insert_rows(through, ["product", "promotion"], (
+			(pk, promotion_id)
+			for pk, price, title in self.products
+			if rng.random() < 0.1
+			for promotion_id in rng.sample(promotion_ids, min(len(promotion_ids), rng.choice([1, 1, 2])))
+		))
+
+	def product(self, n, collection_id):
+		rng = self.rng
+		title = f"{rng.choice(ADJECTIVES).title()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n}"
+		# Log-normal prices: mostly a few dollars, a long tail up to the column's limit.
+		price = Decimal(min(9999.99, max(1.0, rng.lognormvariate(2.5, 1.0)))).quantize(Decimal("0.01"))
+		return Product(
+			title=title,
+			slug=f"product-{self.seed}-{n}",
+			description=" ".join(rng.choices(ADJECTIVES + NOUNS, k=rng.randint(10, 40))),
+			unit_price=price,
+			inventory=rng.randint(1, 1000),
+			collection_id=collection_id,
+		)
+
+	def seed_customers(self):
+		rng = self.rng
+		self.customers = []
+		self.user_ids = []
+
+		for numbers in batched(range(self.count("customers")), self.batch_size):
+			users = [
+				User(
+					username=f"seed-{self.seed}-{n}",
+					email=f"seed-{self.seed}-{n}@example.com",
+					first_name=rng.choice(FIRST_NAMES),
+					last_name=rng.choice(LAST_NAMES),
+					password=self.password,
+				)
+				for n in numbers
+			]
+			with transaction.atomic():
+				users = User.objects.bulk_create(users, batch_size=self.batch_size)
+				customers = Customer.objects.bulk_create([
+					Customer(
+						user_id=user.pk,
+						phone=f"555-{rng.randint(0, 9999):04}",
+						birth_date=date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55)),
+						membership=rng.choices(MEMBERSHIPS, weights=[80, 15, 5])[0],
+					)
+					for user in users
+				], batch_size=self.batch_size)
+
+			self.customers += [(customer.pk, user.first_name) for customer, user in zip(customers, users)]
+			self.user_ids += [user.pk for user in users]
+			self.created(User, len(users))
+			self.created(Customer, len(customers))
+
+	def basket(self, sizes):
+		"""Distinct popular product ids, as many as `sizes` draws (fewer after duplicates)."""
+		return list(dict.fromkeys(self.popularity.sample(sizes.draw())))
+
+	def seed_carts(self):
+		rng = self.rng
+		sizes = Zipf(rng, range(1, 51), exponent=2.0)
+		quantities = Zipf(rng, range(1, 11), exponent=2.0)
+		carts = [Cart(id=uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(self.count("carts"))]
+		cart_ids = self.insert(Cart, carts, keep=lambda cart: cart.pk)
+
+		cart_field = CartItem._meta.get_field("cart")
+		connection = transaction.get_connection()
+		self.insert_rows(CartItem, ["cart", "product", "quantity"], (
+			(cart_field.get_db_prep_value(cart_id, connection), product_id, quantities.draw())
+			for cart_id in cart_ids
+			for product_id in self.basket(sizes)
+		))
+
+	def seed_orders(self):
+		rng = self.rng
+		connection = transaction.get_connection()
+		sizes = Zipf(rng, range(1, 51), exponent=2.0)
+		quantities = Zipf(rng, range(1, 11), exponent=2.0)
+		buyers = Zipf(rng, self.shuffled(self.customers), exponent=0.9)
+
+		# Orders are written with their ids, like loaddata does, so the items
+		# can reference them without a round trip per batch. The sequence is
+		# reset afterwards. placed_at spreads them over the past year.
+		count = self.count("orders")
+		first_id = (Order.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+		now = timezone.now()
+
+		for numbers in batched(range(count), self.batch_size):
+			orders, items = [], []
+			for n in numbers:
+				customer_id, first_name = buyers.draw()
+				basket = [(product_id, quantities.draw()) for product_id in self.basket(sizes)]
+				placed_at = now - timedelta(days=365) * (count - n) / count
+				orders.append((
+					first_id + n,
+					connection.ops.adapt_datetimefield_value(placed_at),
+					rng.choices(PAYMENT_STATUSES, weights=[85, 10, 5])[0],
+					customer_id,
+					# Only the first few titles fit in the summary's 255 characters anyway.
+					Order.summarize([self.titles[product_id] for product_id, quantity in basket[:20]], first_name),
+					sum(self.prices[product_id] * quantity for product_id, quantity in basket),
+					sum(quantity for product_id, quantity in basket),
+				))
+				items += [
+					(first_id + n, product_id, quantity, self.prices[product_id])
+					for product_id, quantity in basket
+				]
+
+			with transaction.atomic():
+				self.write_rows(Order, [
+					"id", "placed_at", "payment_status", "customer", "summary", "total_amount", "item_count",
+				], orders)
+				self.write_rows(OrderItem, ["order", "product", "quantity", "unit_price"], items)
+
+		with connection.cursor() as cursor:
+			for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+				cursor.execute(sql)
+
+	def seed_likes(self):
+		users = Zipf(self.rng, self.shuffled(self.user_ids), exponent=0.9)
+		likes = zip(users.sample(self.count("liked_items")), self.popularity.sample(self.count("liked_items")))
+		self.insert_rows(LikedItem, ["user", "content_type", "object_id"], (
+			(user_id, self.product_type.pk, product_id)
+			# A user likes a product once.
+			for user_id, product_id in dict.fromkeys(likes)
+		))
+
+	def seed_tags(self):
+		rng = self.rng
+		labels = self.shuffled(f"{adjective}-{noun}" for adjective in ADJECTIVES for noun in NOUNS)
+		tag_ids = self.insert(
+			Tag,
+			(
+				Tag(label=labels[n % len(labels)] + (f"-{n // len(labels)}" if n >= len(labels) else ""))
+				for n in range(self.count("tags"))
+			),
+			keep=lambda tag: tag.pk,
+		)
+		tags = Zipf(rng, tag_ids, exponent=1.0)
+		products = [pk for pk, price, title in self.products]
+
+		self.insert_rows(TaggedItem, ["tag", "content_type", "object_id"], (
+			(tag_id, self.product_type.pk, rng.choice(products))
+			for tag_id in tags.sample(self.count("tagged_items"))
+		))
@@ -2,24 +2,23 @@ from decimal import Decimal
 
 from rest_framework import serializers
 
+from store import outbox
 from store.models import Collection, Product, Cart, CartItem, Customer, Order, OrderItem
+from store.sqlite import immediate_atomic
 
 from django.core.validators import MinValueValidator
 
 from core.serializers import UserCreateSerializer
 
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 
-from django.db import transaction
+from django.db.models import Case, F, Q, When
 
 
 class CollectionSerializer(serializers.Serializer):
 	id = serializers.IntegerField(required=False)
 	title = serializers.CharField(max_length=200)
-	products_count = serializers.SerializerMethodField()
-
-	def get_products_count(self, collection):
-		return collection.products.count()
+	products_count = serializers.IntegerField(read_only=True)
 
 	def create(self, validated_data):
 		return Collection.objects.create(**validated_data)
@@ -61,6 +60,8 @@ class CartItemSerializer(serializers.ModelSerializer):
 	total_price = serializers.SerializerMethodField(method_name='calculatePrice')
 
 	def calculatePrice(self, cart_item):
+		if hasattr(cart_item, "total_price"):
+			return cart_item.total_price
 		return cart_item.product.unit_price * cart_item.quantity
 
 	class Meta:
@@ -78,6 +79,9 @@ class CartSerializer(serializers.ModelSerializer):
 	# 	return sum([item.total_price for item in cart.cart_items.all()])
 	
 	def get_total_price(self, cart):
+		if hasattr(cart, "total_price"):
+			return cart.total_price
+
 		total_price = []
 		for item in cart.cart_items.all():
 			total_price.append(item.product.unit_price * item.quantity)
@@ -109,14 +113,7 @@ class AddCartItemSerializer(serializers.ModelSerializer):
 		product_id = self.validated_data['product_id']
 		quantity = self.validated_data.get("quantity")
 
-		try:
-			cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-			cart_item.quantity += quantity
-			cart_item.save()
-			self.instance = cart_item
-		except CartItem.DoesNotExist:
-			self.instance = CartItem.objects.create(cart_id=cart_id, **self.validated_data)
-
+		self.instance = CartItem.objects.add_items(cart_id, [(product_id, quantity)])[0]
 		return self.instance
 
 
@@ -126,6 +123,35 @@ class AddCartItemSerializer(serializers.ModelSerializer):
 		return value
 
 
+class CartItemBatchListSerializer(serializers.ListSerializer):
+	def validate(self, items):
+		product_ids = {item["product_id"] for item in items}
+		existing = set(Product.objects.filter(pk__in=product_ids).order_by().values_list("pk", flat=True))
+		missing = sorted(product_ids - existing)
+
+		if missing:
+			raise serializers.ValidationError({"detail": f"Products don't exist with these ids: {missing}"})
+		return items
+
+	def save(self, replace=False, **kwargs):
+		cart_id = self.context["view"].kwargs.get("uid")
+		items = [(item["product_id"], item["quantity"]) for item in self.validated_data]
+
+		with immediate_atomic():
+			CartItem.objects.add_items(cart_id, items, replace=replace)
+
+		self.instance = Cart.objects.with_items().get(pk=cart_id)
+		return self.instance
+
+
+class CartItemBatchSerializer(serializers.Serializer):
+	product_id = serializers.IntegerField()
+	quantity = serializers.IntegerField(validators=[MinValueValidator(1)])
+
+	class Meta:
+		list_serializer_class = CartItemBatchListSerializer
+
+
 class UpdateCartItemSerializer(serializers.ModelSerializer):
 	class Meta:
 		model = CartItem
@@ -162,18 +188,75 @@ class CustomerOrderSerializer(serializers.ModelSerializer):
 
 	class Meta:
 		model = Order 
-		fields = ["id", "customer","payment_status", "order_items"]
+		fields = ["id", "customer","payment_status", "total_amount", "item_count", "order_items"]
 		read_only_fields = fields
 
 
 class CreateOrderSerializer(serializers.Serializer):
 	cart_id = serializers.UUIDField()
 
+	def validate_cart_id(self, value):
+		if not CartItem.objects.filter(cart_id=value).exists():
+			raise serializers.ValidationError("Cart doesn't exist or is empty")
+		return value
+
 	def save(self, **kwargs):
-		user_id = self.context["user_id"]
+		customer = self.context["customer"]
 		cart_id = self.validated_data.get("cart_id")
 
-		customer = get_object_or_404(Customer, user_id=user_id)
-		order = Order.objects.create(customer=customer)
-		print(order, '**********')
-		return order
\ No newline at end of file
+		if not customer:
+			raise Http404
+
+		with immediate_atomic():
+			cart_items = list(CartItem.objects.select_related("product").filter(cart_id=cart_id))
+			if not cart_items:
+				# Emptied (or checked out) since validation.
+				raise serializers.ValidationError({"cart_id": "Cart doesn't exist or is empty"})
+
+			order = Order.objects.create(
+				customer_id=customer.id,
+				summary=Order.summarize([item.product.title for item in cart_items], self.context["first_name"]),
+				total_amount=sum(item.product.unit_price * item.quantity for item in cart_items),
+				item_count=sum(item.quantity for item in cart_items),
+			)
+			OrderItem.objects.bulk_create([
+				OrderItem(
+					order=order,
+					product=item.product,
+					quantity=item.quantity,
+					unit_price=item.product.unit_price,
+				)
+				for item in cart_items
+			])
+
+			self.reserve_inventory(cart_items)
+			Cart.objects.filter(pk=cart_id).delete()
+
+			outbox.publish("order.placed", {"order_id": order.pk, "customer_id": customer.id})
+			outbox.publish("inventory.reserved", {
+				"order_id": order.pk,
+				"products": {str(item.product_id): item.quantity for item in cart_items},
+			})
+
+		self.instance = order
+		return order
+
+	def reserve_inventory(self, cart_items):
+		"""Take every item out of stock in one UPDATE, or fail the whole order."""
+		in_stock = Q()
+		inventory = []
+		for item in cart_items:
+			in_stock |= Q(pk=item.product_id, inventory__gte=item.quantity)
+			inventory.append(When(pk=item.product_id, then=F("inventory") - item.quantity))
+
+		updated = Product.objects.filter(in_stock).update(inventory=Case(*inventory, default=F("inventory")))
+
+		if updated != len(cart_items):
+			quantities = {item.product_id: item.quantity for item in cart_items}
+			short = [
+				product_id
+				for product_id, stock in Product.objects.filter(pk__in=quantities).values_list("pk", "inventory")
+				if stock < quantities[product_id]
+			]
+			# Raising inside the atomic block rolls the order back too.
+			raise serializers.ValidationError({"detail": f"Not enough inventory for products: {sorted(short)}"})
@@ -1,10 +1,132 @@
-from store.models import Customer 
+from collections import Counter
+
+from store import instrumentation, outbox
+from store.authentication import revoke_user_tokens
+from store.cache import bump_generation
+from store.middleware import get_customer_cache_key
+from store.sqlite import configure_connection
+from store.models import Customer, Collection, Product, Promotion, Order, OrderItem
 
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.signals import connection_created
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs["created"]:
-        Customer.objects.create(user=kwargs["instance"])
\ No newline at end of file
+        with transaction.atomic():
+            customer = Customer.objects.create(user=kwargs["instance"])
+            outbox.publish("customer.created", {"customer_id": customer.pk, "user_id": customer.user_id})
+
+
+# Changing any of these invalidates the access tokens the user already holds.
+TOKEN_SENSITIVE_FIELDS = ("password", "is_active", "is_staff")
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_token_sensitive_fields(sender, instance, raw, update_fields=None, **kwargs):
+    instance._revoke_tokens = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_SENSITIVE_FIELDS):
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).values(*TOKEN_SENSITIVE_FIELDS).first()
+    instance._revoke_tokens = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in TOKEN_SENSITIVE_FIELDS
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_user_change(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_revoke_tokens", False):
+        transaction.on_commit(lambda: revoke_user_tokens(instance.pk))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_collection(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None or hasattr(instance, "_loaded_collection_id"):
+        return
+
+    # Built by hand rather than loaded, so ask the database where it was.
+    instance._loaded_collection_id = (
+        Product.objects.filter(pk=instance.pk).values_list("collection_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_products_count_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+
+    counts = Counter()
+    if created:
+        counts[instance.collection_id] += 1
+    elif instance._loaded_collection_id != instance.collection_id:
+        counts[instance._loaded_collection_id] -= 1
+        counts[instance.collection_id] += 1
+
+    Collection.objects.add_products_count(counts)
+    instance._loaded_collection_id = instance.collection_id
+
+
+@receiver(post_delete, sender=Product)
+def update_products_count_on_delete(sender, instance, **kwargs):
+    Collection.objects.add_products_count({instance.collection_id: -1})
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_generation(sender)
+
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_catalog_cache_on_promotions(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_generation(Product)
+
+
+@receiver(post_save, sender=Order)
+def write_order_summary(sender, instance, created, raw, **kwargs):
+    # Checkout passes the summary in. A brand new order has no items yet.
+    if created and not raw and not instance.summary:
+        instance.summary = Order.summarize([], instance.customer.user.first_name)
+        Order.objects.filter(pk=instance.pk).update(summary=instance.summary)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_on_item_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    with transaction.atomic():
+        orders = Order.objects.filter(pk=instance.order_id)
+        orders.refresh_totals()
+        orders.refresh_summaries()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def forget_cached_customer(sender, instance, **kwargs):
+    # After commit, or a concurrent request could cache the old row again.
+    key = get_customer_cache_key(instance.user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(connection_created)
+def apply_sqlite_profile(sender, connection, **kwargs):
+    configure_connection(connection)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    instrumentation.install(connection)
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+
+# Suited to several gunicorn workers sharing one database file: readers never
+# block the writer under WAL, and writers queue on busy_timeout instead of
+# failing with "database is locked".
+DEFAULT_PRAGMAS = {
+	"journal_mode": "wal",
+	"busy_timeout": 5000,
+	"synchronous": "normal",
+	"mmap_size": 256 * 1024 * 1024,
+	"cache_size": -64 * 1024,
+	"temp_store": "memory",
+}
+
+
+def get_pragmas():
+	pragmas = dict(getattr(settings, "STORE_SQLITE_PRAGMAS", DEFAULT_PRAGMAS))
+	if pragmas.get("journal_mode") == "wal" and not getattr(settings, "STORE_SQLITE_WAL", True):
+		# Keep whatever journal the file already has.
+		del pragmas["journal_mode"]
+	return pragmas
+
+
+def configure_connection(connection):
+	"""Apply the SQLite production profile to a freshly opened connection."""
+	if connection.vendor != "sqlite":
+		return
+
+	with connection.cursor() as cursor:
+		for pragma, value in get_pragmas().items():
+			cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@contextmanager
+def immediate_atomic(using=None):
+	"""
+	transaction.atomic() whose outermost SQLite transaction starts with
+	BEGIN IMMEDIATE. A deferred transaction that reads before it writes has
+	to upgrade its lock, and SQLite refuses that upgrade without waiting on
+	busy_timeout when another writer is active. Taking the write lock up
+	front makes the transaction queue instead. Nested blocks and other
+	backends behave like plain atomic().
+	"""
+	connection = transaction.get_connection(using)
+	if connection.vendor != "sqlite" or connection.in_atomic_block:
+		with transaction.atomic(using=using):
+			yield
+		return
+
+	# Django 4.2 has no transaction_mode option; swap the BEGIN it issues.
+	connection._start_transaction_under_autocommit = lambda: connection.cursor().execute("BEGIN IMMEDIATE")
+	try:
+		with transaction.atomic(using=using):
+			del connection._start_transaction_under_autocommit
+			yield
+	finally:
+		connection.__dict__.pop("_start_transaction_under_autocommit", None)
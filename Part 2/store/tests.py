@@ -1,3 +1,1178 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import User
+from store import async_views, outbox, search, sqlite
+from store.authentication import validated_tokens
+from store.cache import GENERATION_KEY
+from store.instrumentation import fingerprint
+from store.middleware import PIN_COOKIE, QueryInstrumentationMiddleware, ReplicaPinningMiddleware, resolve_customer
+from store.models import Collection, Product, Promotion, Cart, CartItem, Customer, Order, OrderItem, OutboxEvent
+from store.pagination import KeysetPagination
+from store.routers import PrimaryReplicaRouter, pinning
+from store.seeding import StoreSeeder
+
+
+def create_products(count, collection=None, unit_price=10, inventory=100):
+	"""`count` products in `collection` (a new one by default). `unit_price` may be a callable of the index."""
+	if collection is None:
+		collection = Collection.objects.create(title="Collection")
+	return Product.objects.bulk_create([
+		Product(
+			title=f"Product {i}", slug=f"product-{i}", collection=collection, inventory=inventory,
+			unit_price=unit_price(i) if callable(unit_price) else unit_price,
+		)
+		for i in range(count)
+	])
+
+
+class AddCartItemConcurrencyTest(TransactionTestCase):
+	adds = 200
+
+	def setUp(self):
+		self.products = create_products(2)
+		self.cart = Cart.objects.create()
+
+	def add(self, product):
+		try:
+			return APIClient().post(
+				f"/api/v1/store/carts/{self.cart.id}/items",
+				{"product_id": product.id, "quantity": 1},
+				format="json",
+			).status_code
+		finally:
+			connection.close()
+
+	def test_parallel_adds_are_not_lost(self):
+		products = [self.products[i % 2] for i in range(self.adds)]
+
+		with ThreadPoolExecutor(max_workers=16) as executor:
+			statuses = list(executor.map(self.add, products))
+
+		self.assertEqual(statuses, [201] * self.adds)
+		self.assertEqual(
+			sorted(CartItem.objects.filter(cart=self.cart).values_list("quantity", flat=True)),
+			[self.adds // 2, self.adds // 2],
+		)
+
+
+class ProductsCountTest(TestCase):
+	def setUp(self):
+		self.first, self.second = Collection.objects.bulk_create([Collection(title="First"), Collection(title="Second")])
+		self.products = create_products(3, self.first)
+
+	def assertCounts(self, first, second):
+		counts = dict(Collection.objects.values_list("pk", "products_count"))
+		self.assertEqual((counts[self.first.pk], counts[self.second.pk]), (first, second))
+
+	def test_create_and_delete(self):
+		self.assertCounts(3, 0)
+		product = Product.objects.create(
+			title="New", slug="new", unit_price=1, inventory=1, collection=self.second
+		)
+		self.assertCounts(3, 1)
+		product.delete()
+		self.products[0].delete()
+		self.assertCounts(2, 0)
+
+	def test_move(self):
+		product = Product.objects.get(pk=self.products[0].pk)
+		product.collection = self.second
+		product.save()
+		self.assertCounts(2, 1)
+
+		# Saving again, or saving an instance built by hand, moves nothing.
+		product.save()
+		Product(pk=product.pk, title="Built", slug="built", unit_price=1, inventory=1, collection=self.second).save()
+		self.assertCounts(2, 1)
+
+	def test_deferred_collection(self):
+		Product.objects.only("title").get(pk=self.products[0].pk).save()
+		self.assertCounts(3, 0)
+
+		product = Product.objects.only("title").get(pk=self.products[0].pk)
+		product.collection = self.second
+		product.save()
+		self.assertCounts(2, 1)
+
+	def test_bulk_create(self):
+		create_products(2, self.second)
+		self.assertCounts(3, 2)
+
+		Product.objects.bulk_create(
+			[Product(pk=self.products[0].pk, title="Dup", slug="dup", unit_price=1, inventory=1, collection=self.second)]
+			+ [Product(title="New", slug="new", unit_price=1, inventory=1, collection=self.second)],
+			ignore_conflicts=True,
+		)
+		self.assertCounts(3, 3)
+
+	def test_queryset_update(self):
+		Product.objects.filter(pk__in=[self.products[0].pk, self.products[1].pk]).update(collection=self.second)
+		self.assertCounts(1, 2)
+
+		self.products[0].collection = self.first
+		self.products[1].collection = self.products[2].collection = self.second
+		Product.objects.bulk_update(self.products, ["collection"])
+		self.assertCounts(1, 2)
+		self.assertEqual(
+			list(Product.objects.filter(collection=self.first).values_list("pk", flat=True)), [self.products[0].pk]
+		)
+
+	def test_recount_command(self):
+		Collection.objects.update(products_count=7)
+		call_command("recount_collection_products", stdout=StringIO())
+		self.assertCounts(3, 0)
+
+
+class CatalogCacheTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.products = create_products(3)
+		self.paths = ["/api/v1/store/products", f"/api/v1/store/products/{self.products[0].pk}"]
+
+	def assertInvalidatedBy(self, change):
+		for path in self.paths:
+			self.client.get(path)
+			self.assertEqual(self.client.get(path)["X-Cache"], "HIT", path)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			change()
+
+		for path in self.paths:
+			self.assertEqual(self.client.get(path)["X-Cache"], "MISS", path)
+
+	def test_save(self):
+		def save():
+			self.products[0].title = "Renamed"
+			self.products[0].save()
+
+		self.assertInvalidatedBy(save)
+		self.assertEqual(self.client.get(self.paths[1]).data["title"], "Renamed")
+
+	def test_delete(self):
+		self.assertInvalidatedBy(self.products[2].delete)
+
+	def test_queryset_update(self):
+		self.assertInvalidatedBy(lambda: Product.objects.filter(pk=self.products[0].pk).update(inventory=1))
+		self.assertEqual(self.client.get(self.paths[1]).data["inventory"], 1)
+
+	def test_bulk_create(self):
+		self.assertInvalidatedBy(lambda: create_products(1, self.products[0].collection))
+
+	def test_promotions_change(self):
+		promotion = Promotion.objects.create(description="Sale", discount=10)
+		self.assertInvalidatedBy(lambda: self.products[0].promotions.add(promotion))
+
+	def test_replica_sync(self):
+		# Misses may have cached a lagging replica's rows under the current generation.
+		self.assertInvalidatedBy(lambda: call_command("sync_replicas", stdout=StringIO()))
+
+	def test_collections_follow_products_count_only(self):
+		self.paths = ["/api/v1/store/collections", f"/api/v1/store/collections/{self.products[0].collection_id}"]
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Product.objects.filter(pk=self.products[0].pk).update(inventory=1)
+		for path in self.paths:
+			self.client.get(path)
+			self.assertEqual(self.client.get(path)["X-Cache"], "HIT", path)
+
+		self.assertInvalidatedBy(self.products[2].delete)
+		self.assertEqual(self.client.get(self.paths[1]).data["products_count"], 2)
+
+
+class ProductSearchTest(TestCase):
+	def setUp(self):
+		self.collection = Collection.objects.create(title="Collection")
+		self.desk = self.create_product("Desk", "Goes well with a lamp")
+		self.lamp = self.create_product("Lamp", "Bright")
+
+	def create_product(self, title, description):
+		return Product.objects.create(
+			title=title, slug=title.lower(), description=description, unit_price=10, inventory=10,
+			collection=self.collection,
+		)
+
+	def search(self, term):
+		cache.clear()
+		response = self.client.get("/api/v1/store/products", {"search": term})
+		return [product["title"] for product in response.data["results"]]
+
+	def test_writes_are_indexed(self):
+		walnut = self.create_product("Walnut shelf", "Solid")
+		self.assertEqual(self.search("walnut"), ["Walnut shelf"])
+
+		Product.objects.filter(pk=walnut.pk).update(title="Oak shelf")
+		self.assertEqual(self.search("walnut"), [])
+		self.assertEqual(self.search("oak"), ["Oak shelf"])
+
+		walnut.delete()
+		self.assertEqual(self.search("oak"), [])
+
+	def test_title_matches_rank_first(self):
+		self.assertEqual(self.search("lamp"), ["Lamp", "Desk"])
+		self.assertEqual(self.search("la"), ["Lamp", "Desk"])
+		self.assertEqual(self.search("bright lamp"), ["Lamp"])
+
+	def test_icontains_fallback(self):
+		with mock.patch("store.search.is_supported", return_value=False):
+			self.assertEqual(sorted(self.search("amp")), ["Desk", "Lamp"])
+		self.assertEqual(self.search("amp"), [])
+
+	def test_migrate_restores_dropped_triggers(self):
+		with connection.cursor() as cursor:
+			for trigger in ("ai", "ad", "au"):
+				cursor.execute(f"DROP TRIGGER {search.SQLITE_INDEX}_{trigger}")
+		self.assertFalse(search.is_installed())
+
+		emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+		self.assertTrue(search.is_installed())
+		self.create_product("Walnut shelf", "Solid")
+		self.assertEqual(self.search("walnut"), ["Walnut shelf"])
+
+
+class ConditionalGetTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.products = create_products(3)
+		self.paths = ["/api/v1/store/products", f"/api/v1/store/products/{self.products[0].pk}"]
+
+	def validators(self):
+		return [self.client.get(path).get("ETag") for path in self.paths]
+
+	def test_not_modified(self):
+		for path in self.paths:
+			with self.subTest(path=path):
+				full = self.client.get(path)
+				self.assertEqual(full.status_code, 200)
+
+				# The ETag comes from the cache generations: no query at all.
+				with self.assertNumQueries(0):
+					response = self.client.get(path, HTTP_IF_NONE_MATCH=full["ETag"])
+				self.assertEqual(response.status_code, 304)
+				self.assertEqual(response.content, b"")
+
+				# Last-Modified is cached with the response.
+				with self.assertNumQueries(0):
+					response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=full["Last-Modified"])
+				self.assertEqual(response.status_code, 304)
+				self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+	def test_cache_hit_runs_no_query(self):
+		for path in self.paths + ["/api/v1/store/products?pagination=cursor&ordering=unit_price"]:
+			with self.subTest(path=path):
+				self.client.get(path)
+				with self.assertNumQueries(0):
+					response = self.client.get(path)
+				self.assertEqual(response["X-Cache"], "HIT")
+				self.assertIn("Last-Modified", response)
+
+	def test_validators_follow_writes(self):
+		before = self.validators()
+		self.products[0].inventory = 1
+		with self.captureOnCommitCallbacks(execute=True):
+			self.products[0].save()
+		saved = self.validators()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Product.objects.filter(pk=self.products[0].pk).update(inventory=2)
+		updated = self.validators()
+
+		for previous, current in [(before, saved), (saved, updated)]:
+			for path, old, new in zip(self.paths, previous, current):
+				self.assertNotEqual(old, new, path)
+				self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=old).status_code, 200, path)
+
+		last_modified = self.client.get(self.paths[1])["Last-Modified"]
+		with self.captureOnCommitCallbacks(execute=True):
+			Product.objects.filter(pk=self.products[0].pk).update(last_update=timezone.now() + timedelta(minutes=1))
+		self.assertEqual(self.client.get(self.paths[1], HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+		# Deleting a row that isn't the newest still changes the list's ETag.
+		etag = self.client.get(self.paths[0])["ETag"]
+		with self.captureOnCommitCallbacks(execute=True):
+			self.products[2].delete()
+		self.assertNotEqual(self.client.get(self.paths[0])["ETag"], etag)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.products[0].delete()
+		self.assertEqual(self.client.get(self.paths[1]).status_code, 404)
+
+
+@mock.patch.object(KeysetPagination, "page_size", 4)
+class KeysetPaginationTest(TestCase):
+	orderings = ["", "unit_price", "-unit_price", "last_update", "-last_update"]
+
+	def setUp(self):
+		cache.clear()
+		# Few distinct prices and timestamps, so pages split runs of equal keys.
+		self.products = create_products(23, unit_price=lambda i: 10 + i % 3)
+		create_products(5, unit_price=10)
+		now = timezone.now()
+		for i in range(3):
+			Product.objects.filter(pk__in=[product.pk for product in self.products[i::3]]).update(
+				last_update=now - timedelta(minutes=i)
+			)
+
+	def expected(self, ordering, queryset=None):
+		queryset = Product.objects.all() if queryset is None else queryset
+		key = ordering or "id"
+		return list(queryset.order_by(key, "-id" if key.startswith("-") else "id").values_list("id", flat=True))
+
+	def walk(self, url):
+		"""Product ids following `next` from `url`, then `previous` back from the last page."""
+		pages = []
+		while url:
+			response = self.client.get(url)
+			self.assertEqual(response.status_code, 200)
+			self.assertLessEqual(len(response.data["results"]), 4)
+			pages.append([product["id"] for product in response.data["results"]])
+			url = response.data["next"]
+
+		backward = [pages[-1]]
+		url = response.data["previous"]
+		while url:
+			response = self.client.get(url)
+			backward.insert(0, [product["id"] for product in response.data["results"]])
+			url = response.data["previous"]
+
+		self.assertEqual(backward, pages)
+		return [product for page in pages for product in page]
+
+	def test_every_ordering_both_ways(self):
+		for ordering in self.orderings:
+			with self.subTest(ordering=ordering):
+				ids = self.walk(f"/api/v1/store/products?pagination=cursor&ordering={ordering}")
+				self.assertEqual(ids, self.expected(ordering))
+
+	def test_with_filters_and_search(self):
+		collection = self.products[0].collection_id
+		matching = Product.objects.filter(collection_id=collection, unit_price__gt=10, pk__in=[
+			product.pk for product in self.products if product.title.split()[1].startswith("1")
+		])
+		for ordering in self.orderings:
+			with self.subTest(ordering=ordering):
+				ids = self.walk(
+					"/api/v1/store/products?pagination=cursor&search=product+1"
+					f"&collection_id={collection}&unit_price__gt=10&ordering={ordering}"
+				)
+				self.assertEqual(ids, self.expected(ordering, matching))
+				self.assertTrue(ids)
+
+	def test_invalid_cursor(self):
+		self.assertEqual(self.client.get("/api/v1/store/products?pagination=cursor&cursor=garbage").status_code, 404)
+
+		paginator = KeysetPagination()
+		paginator.base_url = "http://testserver/api/v1/store/products?pagination=cursor"
+		for position in ["not json", '{"a": 1}', '["1", "2", "3"]']:
+			with self.subTest(position=position):
+				url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+				self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CartDetailQueriesTest(TestCase):
+	def setUp(self):
+		self.products = create_products(50, unit_price=lambda i: Decimal("2.50") + i)
+
+	def create_cart(self, size):
+		cart = Cart.objects.create()
+		CartItem.objects.add_items(cart.id, [(product.id, 2) for product in self.products[:size]])
+		return cart
+
+	def test_cart_detail_query_count_is_constant(self):
+		for size in [1, 50]:
+			cart = self.create_cart(size)
+			with self.assertNumQueries(2):
+				response = self.client.get(f"/api/v1/store/carts/{cart.id}")
+
+			self.assertEqual(len(response.data["cart_items"]), size)
+			self.assertEqual(
+				response.data["total_price"],
+				sum(product.unit_price * 2 for product in self.products[:size]),
+			)
+
+	def test_cart_items_query_count_is_constant(self):
+		for size in [1, 50]:
+			cart = self.create_cart(size)
+			with self.assertNumQueries(1):
+				response = self.client.get(f"/api/v1/store/carts/{cart.id}/items")
+
+			self.assertEqual(len(response.data), size)
+
+
+class CartItemBatchTest(TestCase):
+	def setUp(self):
+		self.products = create_products(30)
+		self.cart = Cart.objects.create()
+		self.url = f"/api/v1/store/carts/{self.cart.id}/items"
+
+	def test_batch_add_then_sync(self):
+		items = [{"product_id": product.id, "quantity": 2} for product in self.products]
+
+		# cart lookup, product ids, upsert, cart + items; plus the savepoint pair.
+		with self.assertNumQueries(7):
+			response = self.client.post(self.url, items, content_type="application/json")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["total_price"], 30 * 2 * 10)
+
+		response = self.client.post(self.url, items[:1], content_type="application/json")
+		self.assertEqual(response.data["total_price"], 31 * 2 * 10)
+
+		response = self.client.put(self.url, items, content_type="application/json")
+		self.assertEqual(response.data["total_price"], 30 * 2 * 10)
+
+	def test_unknown_cart_is_404_for_both_body_shapes(self):
+		url = f"/api/v1/store/carts/{uuid.uuid4()}/items"
+		item = {"product_id": self.products[0].id, "quantity": 1}
+
+		self.assertEqual(self.client.post(url, item, content_type="application/json").status_code, 404)
+		self.assertEqual(self.client.post(url, [item], content_type="application/json").status_code, 404)
+		self.assertFalse(CartItem.objects.exists())
+
+	def test_batch_rejects_unknown_products(self):
+		items = [{"product_id": self.products[0].id, "quantity": 1}, {"product_id": 0, "quantity": 1}]
+
+		response = self.client.post(self.url, items, content_type="application/json")
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+
+class CheckoutTest(TestCase):
+	def setUp(self):
+		self.products = create_products(20, unit_price=5, inventory=10)
+		self.user = User.objects.create_user(username="buyer", email="buyer@example.com", password="x")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def checkout(self, items):
+		cart = Cart.objects.create()
+		CartItem.objects.add_items(cart.id, items)
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.post("/api/v1/store/orders", {"cart_id": str(cart.id)}, format="json")
+		return cart, response, len(queries)
+
+	def test_checkout_converts_cart_with_fixed_queries(self):
+		resolve_customer(self.user)
+		_, small, small_queries = self.checkout([(self.products[0].id, 1)])
+		cart, large, large_queries = self.checkout([(product.id, 2) for product in self.products])
+
+		self.assertEqual(large.status_code, 201)
+		self.assertEqual(small_queries, large_queries)
+		self.assertEqual(len(large.data["order_items"]), 20)
+		self.assertFalse(Cart.objects.filter(pk=cart.pk).exists())
+		self.assertEqual(Product.objects.get(pk=self.products[0].pk).inventory, 7)
+		self.assertEqual(Product.objects.get(pk=self.products[1].pk).inventory, 8)
+
+	def test_oversell_rolls_back(self):
+		cart, response, _ = self.checkout([(self.products[0].id, 1), (self.products[1].id, 11)])
+
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(Order.objects.exists())
+		self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+		self.assertEqual(Product.objects.get(pk=self.products[0].pk).inventory, 10)
+
+
+class OrderSummaryTest(TestCase):
+	def setUp(self):
+		self.products = create_products(3)
+		self.user = User.objects.create_user(username="buyer", email="buyer@example.com", first_name="Ann")
+		self.customer = self.user.customer_users
+
+	def add_item(self, order, product):
+		return OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.unit_price)
+
+	def assertSummary(self, order, titles):
+		order.refresh_from_db()
+		self.assertEqual(order.summary, f"{titles} is ordered by Ann")
+		with self.assertNumQueries(0):
+			self.assertEqual(str(order), order.summary)
+
+	def test_item_writes_rewrite_the_summary(self):
+		order = Order.objects.create(customer=self.customer)
+		self.assertSummary(order, [])
+
+		first = self.add_item(order, self.products[0])
+		self.add_item(order, self.products[1])
+		self.assertSummary(order, ["Product 0", "Product 1"])
+
+		first.delete()
+		self.assertSummary(order, ["Product 1"])
+
+	def test_checkout_writes_the_summary(self):
+		cart = Cart.objects.create()
+		CartItem.objects.add_items(cart.id, [(product.id, 1) for product in self.products])
+		client = APIClient()
+		client.force_authenticate(self.user)
+
+		response = client.post("/api/v1/store/orders", {"cart_id": str(cart.id)}, format="json")
+		self.assertEqual(response.status_code, 201)
+		self.assertSummary(Order.objects.get(pk=response.data["id"]), ["Product 0", "Product 1", "Product 2"])
+
+	def test_backfill_command(self):
+		orders = [Order.objects.create(customer=self.customer) for _ in range(5)]
+		for order in orders:
+			self.add_item(order, self.products[0])
+		Order.objects.filter(pk__in=[order.pk for order in orders[:4]]).update(summary="")
+		Order.objects.filter(pk=orders[4].pk).update(summary="Kept")
+
+		call_command("backfill_order_summaries", chunk_size=3, stdout=StringIO())
+		for order in orders[:4]:
+			self.assertSummary(order, ["Product 0"])
+		self.assertEqual(Order.objects.get(pk=orders[4].pk).summary, "Kept")
+
+		call_command("backfill_order_summaries", "--all", stdout=StringIO())
+		self.assertSummary(orders[4], ["Product 0"])
+
+
+class OrderTotalsTest(TestCase):
+	def setUp(self):
+		self.products = create_products(3, unit_price=lambda i: Decimal("2.50") + i)
+		self.user = User.objects.create_user(username="buyer", email="buyer@example.com")
+		self.customer = self.user.customer_users
+
+	def create_order(self, quantities):
+		order = Order.objects.create(customer=self.customer)
+		for product, quantity in zip(self.products, quantities):
+			OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+		return order
+
+	def assertTotals(self, order, total_amount, item_count):
+		order.refresh_from_db()
+		self.assertEqual((order.total_amount, order.item_count), (Decimal(total_amount), item_count))
+
+	def test_item_writes_update_the_totals(self):
+		order = self.create_order([2, 1])
+		self.assertTotals(order, "8.50", 3)
+
+		item = order.order_items.get(product=self.products[0])
+		item.quantity = 4
+		item.save()
+		self.assertTotals(order, "13.50", 5)
+
+		item.delete()
+		self.assertTotals(order, "3.50", 1)
+		order.order_items.all().delete()
+		self.assertTotals(order, "0", 0)
+
+	def test_checkout_stores_the_totals(self):
+		cart = Cart.objects.create()
+		CartItem.objects.add_items(cart.id, [(product.id, 2) for product in self.products])
+		client = APIClient()
+		client.force_authenticate(self.user)
+
+		response = client.post("/api/v1/store/orders", {"cart_id": str(cart.id)}, format="json")
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual((response.data["total_amount"], response.data["item_count"]), (Decimal("21.00"), 6))
+		self.assertTotals(Order.objects.get(pk=response.data["id"]), "21.00", 6)
+		self.assertFalse(Order.objects.with_drifted_totals().exists())
+
+	def test_reconcile_command(self):
+		orders = [self.create_order([1, 1, 1]) for _ in range(4)]
+		Order.objects.filter(pk=orders[0].pk).update(total_amount=0)
+		Order.objects.filter(pk=orders[2].pk).update(item_count=99)
+
+		out = StringIO()
+		call_command("reconcile_order_totals", chunk_size=3, stdout=out)
+		self.assertIn("2 orders have drifted", out.getvalue())
+		self.assertEqual(Order.objects.with_drifted_totals().count(), 2)
+
+		out = StringIO()
+		call_command("reconcile_order_totals", "--fix", chunk_size=3, stdout=out)
+		self.assertIn("2 orders had drifted and were fixed", out.getvalue())
+		self.assertFalse(Order.objects.with_drifted_totals().exists())
+		for order in orders:
+			self.assertTotals(order, "10.50", 3)
+
+
+class CustomerOrdersQueriesTest(TestCase):
+	def setUp(self):
+		self.products = create_products(5, unit_price=5, inventory=10)
+		self.staff = User.objects.create_user(username="staff", email="staff@example.com", is_staff=True)
+		self.client = APIClient()
+		self.client.force_authenticate(self.staff)
+
+	def create_orders(self, count):
+		customer = User.objects.create_user(username=f"customer{count}", email=f"c{count}@example.com").customer_users
+		for _ in range(count):
+			order = Order.objects.create(customer=customer)
+			OrderItem.objects.bulk_create([
+				OrderItem(order=order, product=product, quantity=1, unit_price=product.unit_price)
+				for product in self.products
+			])
+
+	def list_orders(self, url="/api/v1/store/orders"):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(url)
+		return response, len(queries)
+
+	def test_query_count_does_not_grow_with_orders(self):
+		self.create_orders(2)
+		_, small = self.list_orders()
+		self.create_orders(40)
+		response, large = self.list_orders()
+
+		self.assertEqual(small, large)
+		self.assertEqual(len(response.data["results"]), 42)
+
+	def test_keyset_pages_cover_every_order(self):
+		self.create_orders(120)
+		seen = []
+		url = "/api/v1/store/orders"
+		while url:
+			response, _ = self.list_orders(url)
+			seen += [order["id"] for order in response.data["results"]]
+			url = response.data["next"]
+
+		self.assertEqual(seen, list(Order.objects.order_by("-placed_at", "-id").values_list("id", flat=True)))
+
+
+class IdempotencyKeyTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.product = create_products(1, unit_price=5, inventory=10)[0]
+		self.user = User.objects.create_user(username="buyer", email="buyer@example.com")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.cart = Cart.objects.create()
+
+	def post(self, url, data, key):
+		return self.client.post(url, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+	def test_retried_add_is_replayed(self):
+		url = f"/api/v1/store/carts/{self.cart.id}/items"
+		first = self.post(url, {"product_id": self.product.id, "quantity": 2}, "add-1")
+		with self.assertNumQueries(0):
+			retry = self.post(url, {"product_id": self.product.id, "quantity": 2}, "add-1")
+
+		self.assertEqual(retry.status_code, first.status_code)
+		self.assertEqual(retry.data, first.data)
+		self.assertEqual(retry["Idempotent-Replayed"], "true")
+		self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 2)
+
+		mismatch = self.post(url, {"product_id": self.product.id, "quantity": 3}, "add-1")
+		self.assertEqual(mismatch.status_code, 422)
+
+	def test_retried_checkout_creates_one_order(self):
+		CartItem.objects.add_items(self.cart.id, [(self.product.id, 1)])
+
+		first = self.post("/api/v1/store/orders", {"cart_id": str(self.cart.id)}, "order-1")
+		retry = self.post("/api/v1/store/orders", {"cart_id": str(self.cart.id)}, "order-1")
+
+		self.assertEqual(first.status_code, 201)
+		self.assertEqual(retry.data["id"], first.data["id"])
+		self.assertEqual(Order.objects.count(), 1)
+
+
+class OutboxTest(TestCase):
+	def setUp(self):
+		self.handlers = dict(outbox.HANDLERS)
+		self.calls = []
+
+	def tearDown(self):
+		outbox.HANDLERS.clear()
+		outbox.HANDLERS.update(self.handlers)
+
+	def test_new_user_publishes_customer_created(self):
+		user = User.objects.create_user(username="someone", email="someone@example.com")
+
+		event = OutboxEvent.objects.get(topic="customer.created")
+		self.assertEqual(event.payload, {"customer_id": user.customer_users.pk, "user_id": user.pk})
+
+	def test_worker_retries_then_dead_letters(self):
+		@outbox.handler("test.flaky")
+		def flaky(payload):
+			self.calls.append(payload)
+			raise RuntimeError("boom")
+
+		outbox.publish("test.flaky", {"n": 1})
+		outbox.publish("test.ok", {"n": 2})
+
+		with self.assertLogs("store.outbox", "ERROR"):
+			done, failed = outbox.dispatch(outbox.claim_batch(), max_attempts=2, backoff=timedelta(0))
+		self.assertEqual((len(done), len(failed)), (1, 1))
+
+		with self.assertLogs("store.outbox", "ERROR"):
+			done, failed = outbox.dispatch(outbox.claim_batch(), max_attempts=2, backoff=timedelta(0))
+		self.assertEqual(failed[0].status, OutboxEvent.STATUS_DEAD)
+		self.assertEqual(outbox.claim_batch(), [])
+		self.assertEqual(len(self.calls), 2)
+
+
+class ImportUsersTest(TestCase):
+	def setUp(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.directory = directory.name
+
+	def write(self, name, rows):
+		path = os.path.join(self.directory, name)
+		with open(path, "w", newline="", encoding="utf-8") as file:
+			if name.endswith(".csv"):
+				writer = csv.DictWriter(file, fieldnames=["username", "email", "password", "phone", "membership"])
+				writer.writeheader()
+				writer.writerows(rows)
+			else:
+				file.writelines(json.dumps(row) + "\n" for row in rows)
+		return path
+
+	def import_users(self, path):
+		call_command("import_users", path, batch_size=2, workers=1, stdout=StringIO())
+
+	def assertImported(self, usernames):
+		users = User.objects.filter(username__in=usernames)
+		self.assertEqual(sorted(users.values_list("username", flat=True)), sorted(usernames))
+		customers = {customer.user_id: customer for customer in Customer.objects.filter(user__in=users)}
+		self.assertEqual(sorted(customers), sorted(user.pk for user in users))
+
+		payloads = OutboxEvent.objects.filter(topic="customer.created").values_list("payload", flat=True)
+		for user in users:
+			self.assertEqual(
+				[payload for payload in payloads if payload["user_id"] == user.pk],
+				[{"customer_id": customers[user.pk].pk, "user_id": user.pk}],
+			)
+
+	def test_csv_and_ndjson(self):
+		for name in ["users.csv", "users.ndjson"]:
+			with self.subTest(name=name):
+				prefix = name.split(".")[1]
+				rows = [{"username": f"{prefix}{i}", "email": f"{prefix}{i}@example.com"} for i in range(3)]
+				rows[0].update(password="secret", phone="555", membership="G")
+				self.import_users(self.write(name, rows))
+
+				self.assertImported([row["username"] for row in rows])
+				user = User.objects.get(username=f"{prefix}0")
+				self.assertTrue(user.check_password("secret"))
+				self.assertEqual((user.customer_users.phone, user.customer_users.membership), ("555", "G"))
+				self.assertFalse(User.objects.get(username=f"{prefix}1").has_usable_password())
+
+	def test_duplicate_rolls_back_its_batch_only(self):
+		rows = [{"username": name, "email": f"{name}@example.com"} for name in ["ann", "bob", "cid", "ann", "dee"]]
+
+		with self.assertRaises(CommandError):
+			self.import_users(self.write("users.ndjson", rows))
+
+		self.assertImported(["ann", "bob"])
+		self.assertFalse(User.objects.filter(username__in=["cid", "dee"]).exists())
+		self.assertEqual(Customer.objects.count(), 2)
+
+
+class CustomerResolutionTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username="member", email="member@example.com")
+
+	def test_customer_is_cached_until_it_changes(self):
+		with self.assertNumQueries(1):
+			self.assertEqual(resolve_customer(self.user).membership, "B")
+		with self.assertNumQueries(0):
+			resolve_customer(self.user)
+
+		customer = self.user.customer_users
+		customer.membership = "G"
+		with self.captureOnCommitCallbacks(execute=True):
+			customer.save()
+			# Still cached until the write commits.
+			self.assertEqual(resolve_customer(self.user).membership, "B")
+
+		self.assertEqual(resolve_customer(self.user).membership, "G")
+
+
+class StatelessJWTAuthenticationTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		validated_tokens.clear()
+		User.objects.create_user(username="member", email="member@example.com", password="member-password")
+		response = self.client.post("/jwt-auth/jwt/create", {"username": "member", "password": "member-password"})
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION=f"JWT {response.json()['access']}")
+
+	def test_known_token_needs_no_user_lookup(self):
+		self.assertEqual(self.client.get("/api/v1/store/orders").status_code, 200)
+
+		# Customer is cached, and the empty page is a single query.
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.client.get("/api/v1/store/orders").status_code, 200)
+		self.assertFalse([query for query in queries if "core_user" in query["sql"]])
+
+	def test_revoked_token_is_refused(self):
+		self.assertEqual(self.client.post("/api/v1/store/tokens/revoke").status_code, 204)
+		self.assertEqual(self.client.get("/api/v1/store/orders").status_code, 401)
+
+	def save(self, user, **fields):
+		for field, value in fields.items():
+			setattr(user, field, value)
+		with self.captureOnCommitCallbacks(execute=True):
+			user.save()
+
+	def test_user_changes_revoke_earlier_tokens(self):
+		for number, fields in enumerate([{"password": "changed"}, {"is_active": False}, {"is_staff": True}]):
+			with self.subTest(fields=fields):
+				user = User.objects.create_user(username=f"user{number}", email=f"user{number}@example.com")
+				earlier = AccessToken.for_user(user)
+				earlier["iat"] -= 1
+				client = APIClient()
+				client.credentials(HTTP_AUTHORIZATION=f"JWT {earlier}")
+
+				self.save(user, first_name="Renamed")
+				self.assertEqual(client.get("/api/v1/store/orders").status_code, 200)
+
+				self.save(user, **fields)
+				self.assertEqual(client.get("/api/v1/store/orders").status_code, 401)
+
+				client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(user)}")
+				self.assertEqual(client.get("/api/v1/store/orders").status_code, 200)
+
+
+class SqlitePragmasTest(SimpleTestCase):
+	def test_wal_is_opt_in(self):
+		with override_settings(STORE_SQLITE_WAL=True):
+			self.assertEqual(sqlite.get_pragmas(), sqlite.DEFAULT_PRAGMAS)
+		with override_settings(STORE_SQLITE_WAL=False):
+			self.assertNotIn("journal_mode", sqlite.get_pragmas())
+			self.assertEqual(sqlite.get_pragmas()["busy_timeout"], 5000)
+		with override_settings(STORE_SQLITE_WAL=False, STORE_SQLITE_PRAGMAS={"journal_mode": "delete"}):
+			self.assertEqual(sqlite.get_pragmas(), {"journal_mode": "delete"})
+
+
+@override_settings(STORE_READ_REPLICAS=["replica"])
+class ReplicaRouterTest(SimpleTestCase):
+	def setUp(self):
+		self.router = PrimaryReplicaRouter()
+
+	def test_catalog_reads_go_to_replicas(self):
+		with pinning():
+			self.assertEqual(self.router.db_for_read(Product), "replica")
+			self.assertEqual(self.router.db_for_read(Collection), "replica")
+			self.assertIsNone(self.router.db_for_read(Cart))
+			self.assertEqual(self.router.db_for_write(Product), "default")
+			# Read-your-writes within the same request.
+			self.assertEqual(self.router.db_for_read(Product), "default")
+
+	def test_writes_outside_a_scope_pin_nothing(self):
+		# A command or worker that writes once keeps reading replicas.
+		self.assertEqual(self.router.db_for_write(Product), "default")
+		self.assertEqual(self.router.db_for_read(Product), "replica")
+		with pinning():
+			self.assertEqual(self.router.db_for_read(Product), "replica")
+
+	def test_writing_request_pins_the_client(self):
+		def view(request):
+			self.router.db_for_write(Cart)
+			return HttpResponse()
+
+		response = ReplicaPinningMiddleware(view)(RequestFactory().post("/"))
+		self.assertIn(PIN_COOKIE, response.cookies)
+
+		def read(request):
+			return HttpResponse(self.router.db_for_read(Product))
+
+		self.assertEqual(ReplicaPinningMiddleware(read)(RequestFactory().get("/")).content, b"replica")
+
+		request = RequestFactory().get("/")
+		request.COOKIES[PIN_COOKIE] = "1"
+		self.assertEqual(ReplicaPinningMiddleware(read)(request).content, b"default")
+
+
+class AsyncReadViewsTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.collection = Collection.objects.create(title="Collection")
+		self.products = create_products(120, self.collection, unit_price=lambda i: i + 1, inventory=10)
+		self.cart = Cart.objects.create()
+		CartItem.objects.add_items(self.cart.pk, [(self.products[0].pk, 2), (self.products[1].pk, 1)])
+
+	def clear_responses(self):
+		"""Drop the cached responses but keep the generations the ETags are made of."""
+		keys = [GENERATION_KEY.format(model._meta.label_lower) for model in (Product, Promotion, Collection)]
+		generations = cache.get_many(keys)
+		cache.clear()
+		cache.set_many(generations, timeout=None)
+
+	async def assertMatchesSyncView(self, view, path, **kwargs):
+		expected = await self.async_client.get(path)
+		await sync_to_async(self.clear_responses)()
+
+		response = await view.as_view()(AsyncRequestFactory().get(path), **kwargs)
+		self.assertEqual(response.status_code, expected.status_code)
+		self.assertEqual(json.loads(response.content), expected.json())
+		for header in ("ETag", "Last-Modified", "Allow"):
+			self.assertEqual(response.get(header), expected.get(header), header)
+		return response
+
+	async def test_fast_paths_match_the_sync_views(self):
+		product = self.products[0].pk
+		await self.assertMatchesSyncView(async_views.ProductsList, "/api/v1/store/products")
+		await self.assertMatchesSyncView(async_views.ProductsList, "/api/v1/store/products?page=2&unit_price__gt=5")
+		await self.assertMatchesSyncView(
+			async_views.ProductsList, f"/api/v1/store/products?collection_id={self.collection.pk}"
+		)
+		await self.assertMatchesSyncView(async_views.ProductDetail, f"/api/v1/store/products/{product}", id=product)
+		await self.assertMatchesSyncView(async_views.CollectionsList, "/api/v1/store/collections")
+		await self.assertMatchesSyncView(
+			async_views.CartDetail, f"/api/v1/store/carts/{self.cart.pk}", uid=self.cart.pk
+		)
+
+	async def test_everything_else_falls_back_to_the_sync_view(self):
+		await self.assertMatchesSyncView(async_views.ProductsList, "/api/v1/store/products?search=Product&ordering=unit_price")
+		await self.assertMatchesSyncView(async_views.ProductsList, "/api/v1/store/products?page=9")
+		await self.assertMatchesSyncView(async_views.ProductDetail, "/api/v1/store/products/0", id=0)
+
+		response = await async_views.ProductsList.as_view()(AsyncRequestFactory().post("/api/v1/store/products", {}))
+		self.assertEqual(response.status_code, 401)
+
+
+@override_settings(STORE_QUERY_SAMPLE_RATE=1.0, STORE_QUERY_REPEAT_THRESHOLD=3)
+class QueryInstrumentationTest(TestCase):
+	def setUp(self):
+		self.products = create_products(5, inventory=10)
+
+	def test_repeated_statement_is_reported(self):
+		def view(request):
+			for product in self.products:
+				Product.objects.get(pk=product.pk)
+			return HttpResponse()
+
+		with self.assertLogs("store.middleware", "WARNING") as logs:
+			response = QueryInstrumentationMiddleware(view)(RequestFactory().get("/"))
+
+		self.assertIn('desc="5 queries"', response["Server-Timing"])
+		self.assertIn("nplusone", response["Server-Timing"])
+		report = json.loads(logs.records[0].getMessage())
+		self.assertEqual(report["queries"], 5)
+		self.assertEqual(list(report["repeated"].values()), [5])
+
+	def test_single_query_is_not_reported(self):
+		def view(request):
+			list(Product.objects.filter(pk__in=[product.pk for product in self.products]))
+			return HttpResponse()
+
+		with self.assertLogs("store.middleware", "INFO") as logs:
+			response = QueryInstrumentationMiddleware(view)(RequestFactory().get("/"))
+
+		self.assertNotIn("nplusone", response["Server-Timing"])
+		self.assertEqual(logs.records[0].levelname, "INFO")
+
+	def test_fingerprint_ignores_arguments(self):
+		self.assertEqual(
+			fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 'a''b' LIMIT 21"),
+			fingerprint("SELECT *  FROM t WHERE id IN (%s) AND x = 'c' LIMIT 1"),
+		)
+
+
+class QueryBudgetTest(TestCase):
+	"""
+	A fixed query budget for every route in store/urls.py, checked at two
+	fixture sizes. An endpoint whose count grows with the data is an N+1.
+	Caches are cleared before each request, so budgets are for cache misses.
+	"""
+	sizes = (5, 40)
+
+	def setUp(self):
+		cache.clear()
+		self.admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+		self.user = User.objects.create_user(
+			username="buyer", email="buyer@example.com", first_name="Buyer", password="secret"
+		)
+		self.customer = Customer.objects.get(user=self.user)
+		self.promotion = Promotion.objects.create(description="Sale", discount=10)
+		self.collection = Collection.objects.create(title="Featured")
+		self.cart = Cart.objects.create()
+
+	def seed(self, size):
+		"""Fill every table the routes read with a volume proportional to `size`."""
+		self.collections = Collection.objects.bulk_create([Collection(title=f"Collection {i}") for i in range(size)])
+
+		self.products = Product.objects.bulk_create([
+			Product(
+				title=f"Product {i}", slug=f"product-{i}", description="A product", unit_price=i + 1,
+				inventory=1000, collection=self.collection if i % 2 else self.collections[i % size],
+			)
+			for i in range(size * 30)
+		])
+		Product.promotions.through.objects.bulk_create([
+			Product.promotions.through(product=product, promotion=self.promotion) for product in self.products
+		])
+
+		CartItem.objects.add_items(self.cart.pk, [(product.pk, 1) for product in self.products[:size]])
+
+		self.orders = Order.objects.bulk_create([Order(customer=self.customer, summary=f"Order {i}") for i in range(size)])
+		OrderItem.objects.bulk_create([
+			OrderItem(order=order, product=product, quantity=1, unit_price=product.unit_price)
+			for order in self.orders
+			for product in self.products[:size]
+		])
+
+	def new_cart(self, size):
+		cart = Cart.objects.create()
+		CartItem.objects.add_items(cart.pk, [(product.pk, 1) for product in self.products[:size]])
+		return cart
+
+	def assertBudget(self, queries, method, path, data=None, user=None, status=200, **extra):
+		"""
+		Request `path` under assertNumQueries once per fixture size, each on
+		its own rolled back seed. `path`, `data` and header values may be
+		callables taking the size, for fixtures the request consumes.
+		"""
+		for size in self.sizes:
+			with self.subTest(size=size), transaction.atomic():
+				self.seed(size)
+				cache.clear()
+				url = path(size) if callable(path) else path
+				payload = data(size) if callable(data) else data
+				headers = {key: value(size) if callable(value) else value for key, value in extra.items()}
+
+				client = APIClient()
+				if user is not None:
+					client.force_authenticate(user)
+
+				with self.assertNumQueries(queries):
+					response = getattr(client, method)(url, payload, format="json", **headers)
+				self.assertEqual(response.status_code, status, response.content)
+				transaction.set_rollback(True)
+
+	def test_api_auth_login_page(self):
+		self.assertBudget(0, "get", "/api/v1/storeapi-auth/login/")
+
+	def test_products_list(self):
+		self.assertBudget(2, "get", "/api/v1/store/products")
+		self.assertBudget(2, "get", "/api/v1/store/products?page=2")
+		self.assertBudget(3, "get", lambda size: f"/api/v1/store/products?collection_id={self.collection.pk}")
+		self.assertBudget(2, "get", "/api/v1/store/products?search=product&ordering=unit_price")
+		# No COUNT in keyset mode: the page is the only query.
+		self.assertBudget(1, "get", "/api/v1/store/products?pagination=cursor&ordering=-unit_price")
+
+	def test_products_create(self):
+		data = {"title": "New", "price": 10, "inventory": 5, "description": "New", "collection": self.collection.pk}
+		self.assertBudget(3, "post", "/api/v1/store/products", data, user=self.admin, status=201)
+
+	def test_product_detail(self):
+		ordered = lambda size: f"/api/v1/store/products/{self.products[0].pk}"
+		unordered = lambda size: f"/api/v1/store/products/{self.products[-1].pk}"
+		self.assertBudget(1, "get", ordered)
+		# Products that were ordered can't be deleted; unordered ones can.
+		self.assertBudget(2, "delete", ordered, user=self.admin, status=405)
+		self.assertBudget(8, "delete", unordered, user=self.admin, status=204)
+
+	def test_collections(self):
+		self.assertBudget(1, "get", "/api/v1/store/collections")
+		self.assertBudget(1, "post", "/api/v1/store/collections", {"title": "New"}, user=self.admin, status=201)
+
+	def test_collection_detail(self):
+		path = lambda size: f"/api/v1/store/collections/{self.collection.pk}"
+		self.assertBudget(1, "get", path)
+		self.assertBudget(2, "put", path, {"title": "Renamed"}, user=self.admin)
+		self.assertBudget(2, "delete", path, user=self.admin, status=405)
+
+	def test_cart_item_detail(self):
+		path = lambda size: f"/api/v1/store/carts/{self.cart.pk}/items/{self.cart.cart_items.first().pk}"
+		self.assertBudget(2, "get", path)
+		self.assertBudget(2, "patch", path, {"quantity": 3})
+		self.assertBudget(2, "delete", path, status=204)
+
+	def test_cart_items(self):
+		path = lambda size: f"/api/v1/store/carts/{self.cart.pk}/items"
+		self.assertBudget(1, "get", path)
+		self.assertBudget(3, "post", path, lambda size: {"product_id": self.products[-1].pk, "quantity": 1}, status=201)
+		batch = lambda size: [{"product_id": product.pk, "quantity": 1} for product in self.products[:size]]
+		self.assertBudget(7, "post", path, batch)
+		self.assertBudget(7, "put", path, batch)
+
+	def test_cart_detail(self):
+		self.assertBudget(2, "get", lambda size: f"/api/v1/store/carts/{self.cart.pk}")
+		self.assertBudget(6, "delete", lambda size: f"/api/v1/store/carts/{self.new_cart(size).pk}", status=204)
+
+	def test_create_cart(self):
+		self.assertBudget(3, "post", "/api/v1/store/carts", status=201)
+
+	def test_customers(self):
+		def data(size):
+			user = User.objects.create_user(username=f"new{size}", email=f"new{size}@example.com")
+			Customer.objects.filter(user=user).delete()
+			return {"user_id": user.pk, "birth_date": "2000-01-01", "membership": "G", "phone": "123"}
+
+		self.assertBudget(1, "post", "/api/v1/store/customers", data, user=self.admin, status=201)
+
+	def test_customer_detail(self):
+		path = lambda size: f"/api/v1/store/customers/{self.customer.pk}"
+		self.assertBudget(1, "get", path)
+		self.assertBudget(2, "patch", path, {"phone": "555"}, user=self.user)
+
+	def test_orders(self):
+		self.assertBudget(3, "get", "/api/v1/store/orders", user=self.user)
+		self.assertBudget(2, "get", "/api/v1/store/orders", user=self.admin)
+		self.assertBudget(
+			15, "post", "/api/v1/store/orders", lambda size: {"cart_id": str(self.new_cart(size).pk)},
+			user=self.user, status=201,
+		)
+
+	def test_revoke_token(self):
+		def authorization(size):
+			# A real token rather than force_authenticate, so there is one to revoke.
+			response = self.client.post("/jwt-auth/jwt/create", {"username": "buyer", "password": "secret"})
+			return f"JWT {response.json()['access']}"
+
+		self.assertBudget(0, "post", "/api/v1/store/tokens/revoke", status=204, HTTP_AUTHORIZATION=authorization)
+
+
+class SeedStoreTest(TestCase):
+	def seed(self, seed=0):
+		with transaction.atomic():
+			counts = StoreSeeder(scale=0.01, seed=seed).run()
+			rows = {
+				"products": list(Product.objects.order_by("pk").values_list("title", "unit_price", "collection__title")),
+				"orders": list(Order.objects.order_by("pk").values_list("customer__user__username", "summary", "total_amount")),
+				"carts": list(Cart.objects.order_by("pk").values_list("pk", flat=True)),
+			}
+			transaction.set_rollback(True)
+		return counts, rows
+
+	def test_deterministic(self):
+		counts, rows = self.seed()
+		self.assertEqual(self.seed(), (counts, rows))
+		self.assertNotEqual(self.seed(seed=1)[1]["products"], rows["products"])
+
+	def test_consistent(self):
+		counts = StoreSeeder(scale=0.01).run()
+
+		self.assertEqual(counts["store.Order"], 1500)
+		self.assertEqual(counts["store.Order"], Order.objects.count())
+		self.assertEqual(counts["store.OrderItem"], OrderItem.objects.count())
+		# Every user got exactly one customer, as the post_save signal would have made.
+		self.assertEqual(Customer.objects.count(), User.objects.count())
+		self.assertFalse(Order.objects.with_drifted_totals().exists())
+		for collection in Collection.objects.annotate(count=Count("products")):
+			self.assertEqual(collection.products_count, collection.count)
+
+		# The orders sequence was reset past the ids written by hand.
+		customer = Customer.objects.first()
+		self.assertGreater(Order.objects.create(customer=customer).pk, counts["store.Order"])
+
+	def test_popularity_is_skewed(self):
+		StoreSeeder(scale=0.01).run()
+		ordered = list(
+			OrderItem.objects.values("product").annotate(count=Count("pk")).order_by("-count").values_list("count", flat=True)
+		)
+		# The top 1% of ordered products carries far more than 1% of the order lines.
+		self.assertGreater(sum(ordered[:len(ordered) // 100]), sum(ordered) * 0.1)
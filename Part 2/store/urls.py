@@ -2,7 +2,8 @@ from django.urls import path, include
 
 from rest_framework.routers import SimpleRouter, DefaultRouter
 
-from store import views
+from store import views, async_views
+from store.async_views import read_view
 
 # router = DefaultRouter()
 # router.register('/products', views.StoreProductViewSet, basename="products")
@@ -12,15 +13,16 @@ from store import views
 
 urlpatterns = [
 	path("api-auth/", include("rest_framework.urls")),
-	path("/products", views.StoreProductsList.as_view(), name="products-list"),
-	path("/products/<int:id>", views.StoreProductDetail.as_view(), name="product-detail"),
-	path("/collections", views.StoreCollectionList.as_view(), name="collections"),
+	path("/products", read_view(views.StoreProductsList, async_views.ProductsList), name="products-list"),
+	path("/products/<int:id>", read_view(views.StoreProductDetail, async_views.ProductDetail), name="product-detail"),
+	path("/collections", read_view(views.StoreCollectionList, async_views.CollectionsList), name="collections"),
 	path("/collections/<int:id>", views.StoreCollectionDetail.as_view(), name="collection-detail"),
 	path("/carts/<uuid:uid>/items/<int:id>", views.ItemDetailView.as_view()),
 	path("/carts/<uuid:uid>/items", views.ItemView.as_view()),
-	path("/carts/<uuid:uid>", views.CartDetail.as_view(), name="cart-detail"),
+	path("/carts/<uuid:uid>", read_view(views.CartDetail, async_views.CartDetail), name="cart-detail"),
 	path("/carts", views.CreateCart.as_view(), name="cart"),
 	path("/customers", views.CustomerView.as_view(), name="customer"),
 	path("/customers/<int:id>", views.CustomerDetail.as_view(), name="customer-detail"),
 	path("/orders", views.CustomerOrders.as_view(), name="customer-orders"),
-]
\ No newline at end of file
+	path("/tokens/revoke", views.RevokeToken.as_view(), name="revoke-token"),
+]
\ No newline at end of file
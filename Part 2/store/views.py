@@ -1,24 +1,30 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
-from django.db import transaction
+from django.db.models import Prefetch
 
 from rest_framework import viewsets
 from rest_framework.generics import ListCreateAPIView, RetrieveDestroyAPIView, CreateAPIView, RetrieveUpdateDestroyAPIView, RetrieveAPIView, ListAPIView, RetrieveUpdateAPIView
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.views import APIView
+from rest_framework.filters import OrderingFilter
 from rest_framework.pagination import PageNumberPagination
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from store.models import Product, Collection, Cart, CartItem, Customer, Order, OrderItem
-from store.serializers import ProductSerializer, CollectionSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, CustomerSerializer, CustomerOrderSerializer, CreateOrderSerializer
-from store.filters import ProductFilter
-from store.pagination import DefaultPagination
+from store.models import Product, Collection, Promotion, Cart, CartItem, Customer, Order, OrderItem
+from store.serializers import ProductSerializer, CollectionSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, CartItemBatchSerializer, UpdateCartItemSerializer, CustomerSerializer, CustomerOrderSerializer, CreateOrderSerializer
+from store.filters import ProductFilter, ProductSearchFilter
+from store.pagination import DefaultPagination, KeysetPagination, OrderPagination
+from store.cache import CachedResponseMixin, ConditionalGetMixin
+from store.idempotency import IdempotentPostMixin
+from store.sqlite import immediate_atomic
 
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 from .permissions import IsAdminUserOrReadOnly
+from store.authentication import STORE_AUTHENTICATION_CLASSES, revoke_token
 
 
 class StoreProductViewSet(viewsets.ModelViewSet):
@@ -45,24 +51,40 @@ class StoreProductViewSet(viewsets.ModelViewSet):
 		return Response(status=204)
 
 
-class StoreProductsList(ListCreateAPIView):
+class StoreProductsList(ConditionalGetMixin, CachedResponseMixin, ListCreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	queryset = Product.objects.filter()
 	serializer_class = ProductSerializer
-	filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+	cache_models = [Product, Promotion]
+	filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
 	# filterset_fields = ["collection_id", "unit_price"]
 	filterset_class = ProductFilter
 	search_fields = ["title", "description"]
 	ordering_fields = ["unit_price", "last_update"]
 	pagination_class = DefaultPagination
+	keyset_pagination_class = KeysetPagination
 	permission_classes = [IsAdminUserOrReadOnly]
 
+	@property
+	def paginator(self):
+		# ?pagination=cursor switches to keyset pages; the cursor links keep the param.
+		if not hasattr(self, "_paginator"):
+			if self.request is not None and self.request.query_params.get("pagination") == "cursor":
+				self._paginator = self.keyset_pagination_class()
+			else:
+				self._paginator = self.pagination_class()
+		return self._paginator
 
 	def get_serializer_context(self):
 		return {"request": self.request}
 
 
-class StoreProductDetail(RetrieveUpdateDestroyAPIView):
+class StoreProductDetail(ConditionalGetMixin, CachedResponseMixin, RetrieveUpdateDestroyAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
+	queryset = Product.objects.filter()
 	serializer_class = ProductSerializer
+	lookup_url_kwarg = "id"
+	cache_models = [Product, Promotion]
 	permission_classes = [IsAdminUserOrReadOnly]
 
 	def get_object(self):
@@ -102,13 +124,18 @@ class StoreCollectionViewSet(viewsets.ModelViewSet):
 		return Response(status=204)
 
 
-class StoreCollectionList(ListCreateAPIView):
+class StoreCollectionList(CachedResponseMixin, ListCreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	queryset = Collection.objects.filter()
 	serializer_class = CollectionSerializer
+	# Product writes that move products_count bump the Collection generation.
+	cache_models = [Collection]
 
 
-class StoreCollectionDetail(RetrieveUpdateDestroyAPIView):
+class StoreCollectionDetail(CachedResponseMixin, RetrieveUpdateDestroyAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	serializer_class = CollectionSerializer
+	cache_models = [Collection]
 
 	def get_object(self):
 		ID = self.kwargs.get("id")
@@ -127,19 +154,27 @@ class StoreCollectionDetail(RetrieveUpdateDestroyAPIView):
 
 
 class CreateCart(CreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	serializer_class = CartSerializer
 
 
 class CartDetail(RetrieveDestroyAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	serializer_class = CartSerializer
 
 	def get_object(self):
 		uid = self.kwargs.get('uid')
 
-		return get_object_or_404(Cart, pk=uid)
+		return get_object_or_404(Cart.objects.with_items(), pk=uid)
+
+	def perform_destroy(self, instance):
+		# Collecting the cascade reads first, so take the write lock up front.
+		with immediate_atomic():
+			instance.delete()
 
 
-class ItemView(ListCreateAPIView):
+class ItemView(IdempotentPostMixin, ListCreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	def get_serializer_class(self):
 		if self.request.method == 'POST':
 			return AddCartItemSerializer
@@ -147,10 +182,37 @@ class ItemView(ListCreateAPIView):
 
 	def get_queryset(self):
 		string = self.kwargs.get("uid")
-		return CartItem.objects.select_related('product').filter(cart_id=string)
+		return CartItem.objects.with_total_price().filter(cart_id=string)
+
+	def create(self, request, *args, **kwargs):
+		# A list body adds every item at once; a single object keeps the old contract.
+		if isinstance(request.data, list):
+			return self.save_batch(request, replace=False)
+		self.check_cart()
+		return super().create(request, *args, **kwargs)
+
+	def put(self, request, *args, **kwargs):
+		# Sync a whole basket: listed products get exactly the given quantity.
+		return self.save_batch(request, replace=True)
+
+	def check_cart(self):
+		# A 404 rather than the foreign key failing on insert.
+		get_object_or_404(Cart.objects.only("pk"), pk=self.kwargs.get("uid"))
+
+	def save_batch(self, request, replace):
+		self.check_cart()
+
+		serializer = CartItemBatchSerializer(
+			data=request.data, many=True, allow_empty=False, context=self.get_serializer_context()
+		)
+		serializer.is_valid(raise_exception=True)
+		cart = serializer.save(replace=replace)
+
+		return Response(CartSerializer(cart).data, status=200)
 
 
 class ItemDetailView(RetrieveUpdateDestroyAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	http_method_names = ['get', 'patch', 'delete']
 
 	def get_serializer_class(self):
@@ -164,12 +226,14 @@ class ItemDetailView(RetrieveUpdateDestroyAPIView):
 		return get_object_or_404(CartItem, pk=string)
 
 class CustomerView(CreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	serializer_class = CustomerSerializer
 	http_method_names = ["post"]
 	permission_classes = [IsAuthenticated]
 
 
 class CustomerDetail(RetrieveUpdateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	serializer_class = CustomerSerializer
 	http_method_names = ["post", 'get', 'patch']
 
@@ -180,7 +244,6 @@ class CustomerDetail(RetrieveUpdateAPIView):
 
 	def get_object(self):
 		user = self.kwargs.get("id")
-		print(self.request.user)
 		return get_object_or_404(Customer, pk=user)
 
 	# @action(detail=False, methods=["GET"])
@@ -197,21 +260,55 @@ class CustomerDetail(RetrieveUpdateAPIView):
 	# 		return Response(serializer.data)
 
 
-class CustomerOrders(ListCreateAPIView):
+class CustomerOrders(IdempotentPostMixin, ListCreateAPIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
 	permission_classes = [IsAuthenticated]
 
-	@transaction.atomic()
+	pagination_class = OrderPagination
+
 	def get_queryset(self):
+		order_items = OrderItem.objects.select_related("product").only(
+			"id", "order_id", "quantity", "unit_price", "product__id", "product__title", "product__unit_price"
+		)
+		queryset = Order.objects.select_related("customer").prefetch_related(
+			Prefetch("order_items", queryset=order_items)
+		)
+
 		if self.request.user.is_staff:
-			return Order.objects.filter()
-		
-		customer = get_object_or_404(Customer, user_id=self.request.user.id)
-		return Order.objects.filter(customer=customer)
+			return queryset
+
+		if not self.request.customer:
+			raise Http404
+		return queryset.filter(customer_id=self.request.customer.id)
 
 	def get_serializer_context(self):
-		return {"user_id": self.request.user.id}
+		return {
+			"user_id": self.request.user.id,
+			"customer": self.request.customer,
+			"first_name": self.request.user.first_name or "",
+		}
+
+	def create(self, request, *args, **kwargs):
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		order = serializer.save()
+
+		order = self.get_queryset().get(pk=order.pk)
+		return Response(CustomerOrderSerializer(order).data, status=201)
 	
 	def get_serializer_class(self):
 		if self.request.method == 'POST':
 			return CreateOrderSerializer
 		return CustomerOrderSerializer
+
+
+class RevokeToken(APIView):
+	authentication_classes = STORE_AUTHENTICATION_CLASSES
+	permission_classes = [IsAuthenticated]
+
+	def post(self, request):
+		if request.auth is None or not hasattr(request.auth, "payload"):
+			return Response({"error": "Only JWT authenticated requests can revoke their token"}, status=400)
+
+		revoke_token(request.auth)
+		return Response(status=204)
@@ -63,11 +63,14 @@ PROJECT_APPS = [
 ]
 
 MIDDLEWARE = [
+    "store.middleware.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "store.middleware.CustomerMiddleware",
+    "store.middleware.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -107,15 +110,86 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # A file rather than shared-cache memory, so tests can write from several threads.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
+# Catalog read replicas: comma separated SQLite files kept in sync with the
+# primary, e.g. DATABASE_REPLICAS=db_replica.sqlite3 (see the sync_replicas command).
+STORE_READ_REPLICAS = []
+for index, name in enumerate(filter(None, os.environ.get("DATABASE_REPLICAS", "").split(","))):
+    DATABASES[f"replica{index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / name.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    STORE_READ_REPLICAS.append(f"replica{index}")
+
+DATABASE_ROUTERS = ["store.routers.PrimaryReplicaRouter"]
+
+# How long a client that wrote keeps reading the catalog from primary.
+STORE_REPLICA_PIN_SECONDS = 5
+
+# The store keeps shared state in the cache: response cache generations, the
+# JWT denylists, idempotency keys and cached customers. LocMemCache is per
+# process, so with more than one worker (gunicorn -w N, several hosts) set
+# CACHE_URL to a shared backend: redis://host:6379/0, or file:///path/to/dir
+# for workers on a single host.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+if CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("file://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_URL[len("file://"):],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Share of requests whose queries are counted, timed and checked for N+1s.
+STORE_QUERY_SAMPLE_RATE = float(os.environ.get("STORE_QUERY_SAMPLE_RATE", 1.0 if DEBUG else 0.01))
+
+# A statement run more often than this in one request is reported as an N+1.
+STORE_QUERY_REPEAT_THRESHOLD = 5
+
+# Serve catalog and cart reads with the native async views (store.async_views).
+# Opt-in, and only worth it under ASGI: set STORE_ASYNC_VIEWS=True in the
+# environment of the ASGI server.
+STORE_ASYNC_VIEWS = os.environ.get("STORE_ASYNC_VIEWS") == "True"
+
+# How long a cached catalog response may live; writes invalidate it sooner.
+STORE_CACHE_TIMEOUT = 60 * 15
+
+# How long a response is replayed for a repeated Idempotency-Key.
+STORE_IDEMPOTENCY_TTL = 60 * 60 * 24
+
+# How long request.customer stays cached per user; Customer writes evict it.
+STORE_CUSTOMER_CACHE_TIMEOUT = 60 * 60
+
+# Every new SQLite connection runs store.sqlite.DEFAULT_PRAGMAS, or
+# STORE_SQLITE_PRAGMAS if it is set. WAL is recorded in the database file and
+# leaves -wal/-shm files beside it, so it stays off in development and the
+# checked-in db.sqlite3 keeps its rollback journal.
+STORE_SQLITE_WAL = os.environ.get("STORE_SQLITE_WAL", str(not DEBUG)) == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_AUTHENTICATION_CLASSES': [
         "rest_framework.authentication.SessionAuthentication",
-        # 'rest_framework_simplejwt.authentication.JWTAuthentication',
+        "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
 }
 
@@ -174,8 +248,12 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     "ACCESS_TOKEN_LIFETIME": timedelta(days=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.TokenObtainPairSerializer",
 }
 
+# Decoded access tokens kept per process by the store's stateless JWT auth.
+STORE_JWT_CACHE_SIZE = 10_000
+
 DJOSER = {
     "SERIALIZERS": {
         'user_create': 'core.serializers.UserCreateSerializer',